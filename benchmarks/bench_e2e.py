@@ -0,0 +1,178 @@
+"""
+End-to-end benchmark of filabel modes against local fake GitHub API
+
+Starts benchmarks/fakegithub.py, runs filabel once per mode in a fresh
+process and reports wall time, request counts, requests per second and
+peak RSS. Results are saved as JSON for comparison between runs.
+
+    python benchmarks/bench_e2e.py --repos 4 --prs 200 --files 30 \\
+        --latency 0.05 --mode sync --mode async --output results.json
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+RUNNER = """
+import sys
+import filabel.github as github
+github.GitHub.BASE_URL = github.GitHubAsync.BASE_URL = sys.argv[1]
+from filabel.cli import main
+main(sys.argv[2:])
+"""
+"""
+Runs filabel CLI against given API URL
+"""
+
+MODES = {
+    'sync': [],
+    'threads': ['--threads', '8'],
+    'async': ['--async'],
+    'graphql': ['--graphql'],
+}
+"""
+CLI arguments of benchmarked modes
+"""
+
+
+def freePort():
+    """Find unused TCP port
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def call(url, method='GET'):
+    """Call fake API control endpoint
+    """
+    request = urllib.request.Request(url, method=method, data=b'' if method == 'POST' else None)
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def startServer(args, port):
+    """Start fake GitHub API and wait until it listens
+
+    :return: server process
+    :rtype: subprocess.Popen
+    """
+
+    server = subprocess.Popen([sys.executable, os.path.join(HERE, 'fakegithub.py'),
+                               '--prs', str(args.prs), '--files', str(args.files),
+                               '--latency', str(args.latency), '--port', str(port)])
+    for _ in range(100):
+        if server.poll() is not None:
+            break
+        try:
+            call(F'http://127.0.0.1:{port}/_stats')
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError('Fake GitHub API did not start')
+
+
+def writeConfigs(directory, modules):
+    """Write auth and labels configuration
+
+    :return: auth and labels paths
+    :rtype: tuple
+    """
+
+    auth = os.path.join(directory, 'auth.cfg')
+    with open(auth, 'w') as file:
+        file.write('[github]\ntoken = benchmark\nsecret = benchmark\n')
+
+    labels = os.path.join(directory, 'labels.cfg')
+    with open(labels, 'w') as file:
+        file.write('[labels]\n')
+        for i in range(modules):
+            file.write(F'module{i} =\n    src/module{i}/*\n    docs/module{i}/*.rst\n')
+        file.write('docs = docs/*\n')
+    return auth, labels
+
+
+def runMode(mode, args, url, auth, labels):
+    """Run filabel once and measure it
+
+    :return: measured values
+    :rtype: dict
+    """
+
+    command = [sys.executable, '-c', RUNNER, url, '-a', auth, '-l', labels]
+    command += MODES[mode] + args.extra
+    command += [F'bench/repo{i}' for i in range(args.repos)]
+
+    call(url + '_reset', 'POST')
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                               env=dict(os.environ, PYTHONPATH=os.pathsep.join(
+                                   [os.path.dirname(HERE), os.environ.get('PYTHONPATH', '')])))
+    stderr = process.stderr.read()
+    _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - start
+
+    counts = call(url + '_stats')
+    total = counts.pop('total', 0)
+    maxrss = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+    return {
+        'mode': mode,
+        'status': os.waitstatus_to_exitcode(status),
+        'wall': wall,
+        'cpu': usage.ru_utime + usage.ru_stime,
+        'requests': total,
+        'requestsPerSecond': total / wall if wall else 0.0,
+        'peakRss': maxrss,
+        'counts': counts,
+        'stderr': stderr.decode('utf-8', 'replace')[-2000:],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repos', type=int, default=2)
+    parser.add_argument('--prs', type=int, default=100)
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--modules', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--mode', action='append', choices=sorted(MODES))
+    parser.add_argument('--extra', action='append', default=[],
+                        help='Extra filabel argument, can be repeated')
+    parser.add_argument('--output', help='Save results as JSON')
+    args = parser.parse_args()
+
+    port = freePort()
+    url = F'http://127.0.0.1:{port}/'
+    server = startServer(args, port)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            auth, labels = writeConfigs(directory, args.modules)
+            for mode in args.mode or ['sync', 'async']:
+                result = runMode(mode, args, url, auth, labels)
+                results.append(result)
+                print('{mode:8} status={status} wall={wall:8.2f}s cpu={cpu:7.2f}s '
+                      'requests={requests:6} req/s={requestsPerSecond:8.1f} '
+                      'rss={rssMb:7.1f}MB'.format(rssMb=result['peakRss'] / 2 ** 20, **result))
+    finally:
+        server.terminate()
+        server.wait()
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'parameters': vars(args), 'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
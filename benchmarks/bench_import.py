@@ -0,0 +1,100 @@
+"""
+Import time benchmark of filabel CLI startup
+
+Runs every command in fresh process with -X importtime, reports
+cumulative import time of filabel modules (best of several runs) and
+fails when startup imports forbidden modules (HTTP clients, web
+framework, event loop) or total import time exceeds budget:
+
+    python benchmarks/bench_import.py --budget 100 --runs 5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+COMMANDS = {
+    'import': ['-c', 'import filabel.cli'],
+    'help': ['-m', 'filabel', '--help'],
+}
+"""
+Measured Python arguments
+"""
+
+FORBIDDEN = ('aiohttp', 'requests', 'flask', 'asyncio')
+"""
+Modules which must not be imported before labeling starts
+"""
+
+
+def importTimes(arguments):
+    """Run Python with -X importtime
+
+    :return: cumulative microseconds by module, top level modules
+    :rtype: tuple
+    """
+
+    process = subprocess.run([sys.executable, '-X', 'importtime'] + arguments,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                             env=dict(os.environ, PYTHONPATH=os.pathsep.join(
+                                 [os.path.dirname(HERE), os.environ.get('PYTHONPATH', '')])))
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.decode('utf-8', 'replace')[-2000:])
+
+    times = {}
+    roots = []
+    for line in process.stderr.decode('utf-8', 'replace').splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+        if not name[1:].startswith(' '):
+            roots.append(name.strip())
+    return times, roots
+
+
+def measure(command, runs):
+    """Measure command several times, keep fastest run
+
+    :return: measured values
+    :rtype: dict
+    """
+
+    best = None
+    for _ in range(runs):
+        times, roots = importTimes(COMMANDS[command])
+        total = sum(times[name] for name in roots if name.startswith('filabel'))
+        if best is None or total < best['total']:
+            best = {'command': command, 'total': total,
+                    'forbidden': sorted(name for name in times if name in FORBIDDEN)}
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--command', action='append', choices=sorted(COMMANDS))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=100.0,
+                        help='Maximal import time of filabel modules in ms')
+    args = parser.parse_args()
+
+    failed = False
+    for command in args.command or sorted(COMMANDS):
+        result = measure(command, args.runs)
+        print('{command:8} filabel={ms:7.1f}ms'.format(ms=result['total'] / 1000, **result))
+        if result['forbidden']:
+            print('  forbidden imports: ' + ', '.join(result['forbidden']))
+            failed = True
+        if result['total'] / 1000 > args.budget:
+            print('  over budget of {:.1f}ms'.format(args.budget))
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Micro-benchmark of compiled LabelMatcher against per-file getLabels
+
+    python benchmarks/bench_matcher.py --labels 300 --files 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from filabel.github import getLabels
+from filabel.matcher import LabelMatcher
+
+
+def generateLabels(count, rnd):
+    """Generate synthetic labels definition
+
+    :param count: Number of labels
+    :type count: int
+    :param rnd: Random generator
+    :type rnd: random.Random
+    :return: Labels
+    :rtype: dict
+    """
+
+    labels = {}
+    for i in range(count):
+        labels[F'label{i}'] = [
+            F'src/module{i}/*',
+            F'*/module{i}/*.py',
+            F'docs/module{rnd.randrange(count)}/*.rst',
+        ]
+    labels['everything'] = ['*']
+    return labels
+
+
+def generateFiles(count, modules, rnd):
+    """Generate synthetic file paths
+
+    :param count: Number of files
+    :type count: int
+    :param modules: Number of modules
+    :type modules: int
+    :param rnd: Random generator
+    :type rnd: random.Random
+    :return: Paths
+    :rtype: list
+    """
+
+    roots = ['src', 'docs', 'tests', 'lib']
+    exts = ['py', 'rst', 'txt', 'c']
+    return ['{}/module{}/file{}.{}'.format(rnd.choice(roots), rnd.randrange(modules),
+                                           i, rnd.choice(exts)) for i in range(count)]
+
+
+def measure(func):
+    """Measure wall time of function call
+
+    :return: result and seconds
+    :rtype: tuple
+    """
+
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--labels', type=int, default=300)
+    parser.add_argument('--files', type=int, default=5000)
+    parser.add_argument('--prs', type=int, default=5,
+                        help='PRs sharing the same files (memoization)')
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    labels = generateLabels(args.labels, rnd)
+    files = generateFiles(args.files, args.labels, rnd)
+
+    def legacy():
+        result = set()
+        for _ in range(args.prs):
+            for file in files:
+                result.update(getLabels(labels, file))
+        return result
+
+    def compiled():
+        matcher = LabelMatcher(labels)
+        result = set()
+        for _ in range(args.prs):
+            result |= matcher.matchFiles(files)
+        return result
+
+    expected, legacyTime = measure(legacy)
+    actual, compiledTime = measure(compiled)
+    assert expected == actual, 'Matcher result differs from getLabels'
+
+    print(F'labels={args.labels} files={args.files} prs={args.prs}')
+    print(F'getLabels    {legacyTime:8.3f} s')
+    print(F'LabelMatcher {compiledTime:8.3f} s  ({legacyTime / compiledTime:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Memory benchmark of PR records against decoded GitHub PR objects
+
+Generates pages of synthetic REST PR objects shaped like GitHub ones
+(nested user, repo, head and base objects with their API links), decodes
+them and keeps all PRs as full dicts (before) or as compact records
+(after). Reports peak and retained traced memory and decode time (slowed
+down by tracing), exits with 1 when retained memory per record exceeds
+the budget. tests/test_records.py checks the budget on fewer PRs:
+
+    python benchmarks/bench_memory.py --prs 20000 --budget 1024
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from filabel.github import parseJson
+from filabel.records import pullRequests
+
+
+REPO_LINKS = ('forks', 'keys', 'collaborators', 'teams', 'hooks', 'issue_events', 'events',
+              'assignees', 'branches', 'tags', 'blobs', 'git_tags', 'git_refs', 'trees',
+              'statuses', 'languages', 'stargazers', 'contributors', 'subscribers',
+              'subscription', 'commits', 'git_commits', 'comments', 'issue_comment',
+              'contents', 'compare', 'merges', 'archive', 'downloads', 'issues', 'pulls',
+              'milestones', 'notifications', 'labels', 'releases', 'deployments')
+"""
+Link fields of GitHub repo object
+"""
+
+
+def user(login, number):
+    """Synthetic GitHub user object
+    """
+    base = F'https://api.github.com/users/{login}'
+    return {'login': login, 'id': number, 'node_id': F'U_{number:012d}',
+            'avatar_url': F'https://avatars.githubusercontent.com/u/{number}?v=4',
+            'gravatar_id': '', 'url': base, 'html_url': F'https://github.com/{login}',
+            'followers_url': base + '/followers', 'following_url': base + '/following{/other_user}',
+            'gists_url': base + '/gists{/gist_id}', 'starred_url': base + '/starred{/owner}{/repo}',
+            'subscriptions_url': base + '/subscriptions', 'organizations_url': base + '/orgs',
+            'repos_url': base + '/repos', 'events_url': base + '/events{/privacy}',
+            'received_events_url': base + '/received_events', 'type': 'User', 'site_admin': False}
+
+
+def repository(owner, name, number):
+    """Synthetic GitHub repo object
+    """
+    base = F'https://api.github.com/repos/{owner}/{name}'
+    repo = {'id': number, 'node_id': F'R_{number:012d}', 'name': name,
+            'full_name': F'{owner}/{name}', 'private': False, 'owner': user(owner, number),
+            'html_url': F'https://github.com/{owner}/{name}', 'description': 'Synthetic repo',
+            'fork': False, 'url': base, 'created_at': '2020-01-01T00:00:00Z',
+            'updated_at': '2024-01-01T00:00:00Z', 'pushed_at': '2024-01-01T00:00:00Z',
+            'size': 1024, 'stargazers_count': 10, 'watchers_count': 10, 'language': 'Python',
+            'default_branch': 'master', 'open_issues_count': 5, 'topics': ['even']}
+    for link in REPO_LINKS:
+        repo[F'{link}_url'] = F'{base}/{link}'
+    return repo
+
+
+def pullRequest(owner, name, number):
+    """Synthetic GitHub PR object
+    """
+    base = F'https://api.github.com/repos/{owner}/{name}'
+    return {
+        'url': F'{base}/pulls/{number}', 'id': number, 'node_id': F'PR_{number:012d}',
+        'html_url': F'https://github.com/{owner}/{name}/pull/{number}',
+        'diff_url': F'https://github.com/{owner}/{name}/pull/{number}.diff',
+        'patch_url': F'https://github.com/{owner}/{name}/pull/{number}.patch',
+        'issue_url': F'{base}/issues/{number}', 'number': number, 'state': 'open',
+        'locked': False, 'title': F'Synthetic PR {number}', 'user': user('author', number),
+        'body': 'x' * 512, 'created_at': '2024-01-01T00:00:00Z',
+        'updated_at': '2024-01-02T00:00:00Z', 'closed_at': None, 'merged_at': None,
+        'merge_commit_sha': F'{number:040x}', 'assignee': None, 'assignees': [],
+        'requested_reviewers': [], 'requested_teams': [],
+        'labels': [{'id': i, 'name': F'module{(number + i) % 20}', 'color': 'ededed',
+                    'default': False} for i in range(3)],
+        'milestone': None, 'draft': False,
+        'commits_url': F'{base}/pulls/{number}/commits',
+        'review_comments_url': F'{base}/pulls/{number}/comments',
+        'comments_url': F'{base}/issues/{number}/comments',
+        'statuses_url': F'{base}/statuses/{number:040x}',
+        'head': {'label': F'fork:feature{number}', 'ref': F'feature{number}',
+                 'sha': F'{number:040x}', 'user': user('fork', number),
+                 'repo': repository('fork', name, number)},
+        'base': {'label': F'{owner}:master', 'ref': 'master', 'sha': F'{0:040x}',
+                 'user': user(owner, 1), 'repo': repository(owner, name, 1)},
+        'author_association': 'CONTRIBUTOR', 'auto_merge': None, 'active_lock_reason': None,
+    }
+
+
+def pages(count):
+    """Encoded pages of 100 PRs
+
+    :return: JSON bodies
+    :rtype: list of bytes
+    """
+
+    prs = [pullRequest('bench', 'repo', number) for number in range(1, count + 1)]
+    return [json.dumps(prs[i:i + 100]).encode('utf-8') for i in range(0, count, 100)]
+
+
+def measure(mode, bodies):
+    """Decode all pages and keep PRs
+
+    :return: measured values
+    :rtype: dict
+    """
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = []
+    for body in bodies:
+        if mode == 'dicts':
+            kept.extend(json.loads(body))
+        else:
+            kept.extend(pullRequests(parseJson(body)))
+    seconds = time.perf_counter() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'mode': mode, 'prs': len(kept), 'seconds': seconds,
+            'peak': peak, 'retained': retained, 'perPr': retained / len(kept)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--prs', type=int, default=20000)
+    parser.add_argument('--budget', type=float, default=1024.0,
+                        help='Maximal retained bytes per PR record')
+    args = parser.parse_args()
+
+    bodies = pages(args.prs)
+    print('page size {:.1f} KB, {:.1f} KB per PR'.format(
+        len(bodies[0]) / 1024, sum(map(len, bodies)) / args.prs / 1024))
+    results = {}
+    for mode in ('dicts', 'records'):
+        result = results[mode] = measure(mode, bodies)
+        print('{mode:8} prs={prs} decode={seconds:6.2f}s peak={peakMb:8.1f}MB '
+              'retained={retainedMb:8.1f}MB per PR={perPr:8.0f}B'.format(
+                  peakMb=result['peak'] / 2 ** 20, retainedMb=result['retained'] / 2 ** 20,
+                  **result))
+    print('retained memory reduced {:.1f}x'.format(
+        results['dicts']['retained'] / results['records']['retained']))
+    if results['records']['perPr'] > args.budget:
+        print('  over budget of {:.0f}B per PR'.format(args.budget))
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""
+Load comparison of Flask and asyncio webhook servers
+
+Starts benchmarks/fakegithub.py and each server in fresh process, sends
+signed pull_request deliveries for distinct PRs with given client
+concurrency and reports response latency percentiles and the time until
+all PRs are labeled (label writes seen by fake API):
+
+    python benchmarks/bench_web.py --deliveries 500 --concurrency 100 \\
+        --latency 0.05 --server flask --server aiohttp --output results.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import aiohttp
+
+from bench_e2e import HERE, call, freePort, startServer, writeConfigs
+
+
+SERVERS = {
+    'flask': """
+import sys
+import filabel.github as github
+github.GitHub.BASE_URL = github.GitHubAsync.BASE_URL = sys.argv[1]
+from filabel.web import app
+app.run('127.0.0.1', int(sys.argv[2]), threaded=True)
+""",
+    'aiohttp': """
+import sys
+import filabel.github as github
+github.GitHub.BASE_URL = github.GitHubAsync.BASE_URL = sys.argv[1]
+from aiohttp import web
+from filabel.aioweb import createApp
+web.run_app(createApp(), host='127.0.0.1', port=int(sys.argv[2]), print=None, access_log=None)
+""",
+}
+"""
+Runners of benchmarked servers against given API URL
+"""
+
+
+def payload(url, repo, number):
+    """Signed pull_request delivery of synthetic PR
+
+    :return: body
+    :rtype: bytes
+    """
+
+    return json.dumps({
+        'action': 'opened',
+        'repository': {'full_name': F'bench/{repo}'},
+        'pull_request': {
+            'number': number,
+            'url': F'{url}repos/bench/{repo}/pulls/{number}',
+            'issue_url': F'{url}repos/bench/{repo}/issues/{number}',
+            'html_url': F'https://github.com/bench/{repo}/pull/{number}',
+            'labels': [],
+            'head': {'sha': F'head{number}'},
+            'base': {'repo': {'full_name': F'bench/{repo}'}},
+        },
+    }).encode('utf-8')
+
+
+def writes(url):
+    """Number of label writes seen by fake API
+    """
+    return sum(count for key, count in call(url + '_stats').items() if key.endswith('/labels'))
+
+
+async def deliver(server, bodies, concurrency):
+    """Send deliveries with bounded concurrency
+
+    :return: response latencies in seconds, non 202 statuses
+    :rtype: tuple
+    """
+
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    latencies = []
+    failures = []
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def send(i, body):
+            signature = 'sha1=' + hmac.new(b'benchmark', body, hashlib.sha1).hexdigest()
+            headers = {'Content-Type': 'application/json', 'X-GitHub-Event': 'pull_request',
+                       'X-Hub-Signature': signature, 'X-GitHub-Delivery': str(i)}
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    async with session.post(server + 'webhook', data=body, headers=headers) as response:
+                        await response.read()
+                        status = response.status
+                except aiohttp.ClientError as err:
+                    status = type(err).__name__
+                latencies.append(time.perf_counter() - start)
+                if status != 202:
+                    failures.append(status)
+
+        await asyncio.gather(*(send(i, body) for i, body in enumerate(bodies)))
+    return latencies, failures
+
+
+def percentile(values, fraction):
+    """Value at fraction of sorted values
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+def runServer(name, args, url, config):
+    """Run server, deliver webhooks and wait until PRs are labeled
+
+    :return: measured values
+    :rtype: dict
+    """
+
+    port = freePort()
+    server = F'http://127.0.0.1:{port}/'
+    env = dict(os.environ, FILABEL_CONFIG=config, FILABEL_QUEUE_SIZE=str(args.deliveries),
+               PYTHONPATH=os.pathsep.join([os.path.dirname(HERE), os.environ.get('PYTHONPATH', '')]))
+    if args.workers:
+        env['FILABEL_WORKERS'] = str(args.workers)
+    process = subprocess.Popen([sys.executable, '-c', SERVERS[name], url, str(port)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+    try:
+        for _ in range(100):
+            try:
+                with urllib.request.urlopen(server):
+                    break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError(F'{name} server did not start')
+        call(url + '_reset', 'POST')
+
+        bodies = [payload(url, F'repo{i % args.repos}', i // args.repos + 1)
+                  for i in range(args.deliveries)]
+        start = time.perf_counter()
+        latencies, failures = asyncio.run(deliver(server, bodies, args.concurrency))
+        accepted = time.perf_counter() - start
+        while writes(url) < args.deliveries - len(failures):
+            if time.perf_counter() - start > args.timeout:
+                break
+            time.sleep(0.05)
+        labeled = time.perf_counter() - start
+        # Writes are counted when they arrive, let the last ones finish
+        time.sleep(2 * args.latency)
+    finally:
+        process.terminate()
+        process.wait()
+
+    return {
+        'server': name,
+        'accepted': accepted,
+        'labeled': labeled,
+        'deliveriesPerSecond': args.deliveries / labeled if labeled else 0.0,
+        'p50': percentile(latencies, 0.5),
+        'p99': percentile(latencies, 0.99),
+        'failures': len(failures),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--deliveries', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--repos', type=int, default=3)
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--modules', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--workers', type=int, default=0,
+                        help='FILABEL_WORKERS of servers, their defaults if 0')
+    parser.add_argument('--timeout', type=float, default=300.0)
+    parser.add_argument('--server', action='append', choices=sorted(SERVERS))
+    parser.add_argument('--output', help='Save results as JSON')
+    args = parser.parse_args()
+    args.prs = (args.deliveries + args.repos - 1) // args.repos
+
+    port = freePort()
+    url = F'http://127.0.0.1:{port}/'
+    fake = startServer(args, port)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            auth, labels = writeConfigs(directory, args.modules)
+            for name in args.server or ['flask', 'aiohttp']:
+                result = runServer(name, args, url, F'{auth}:{labels}')
+                results.append(result)
+                print('{server:8} accepted={accepted:7.2f}s labeled={labeled:7.2f}s '
+                      'deliveries/s={deliveriesPerSecond:8.1f} p50={p50ms:7.1f}ms '
+                      'p99={p99ms:7.1f}ms failures={failures}'.format(
+                          p50ms=result['p50'] * 1000, p99ms=result['p99'] * 1000, **result))
+    finally:
+        fake.terminate()
+        fake.wait()
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'parameters': vars(args), 'results': results}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
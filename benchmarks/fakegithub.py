@@ -0,0 +1,281 @@
+"""
+Local stand-in for the GitHub API endpoints used by filabel
+
+Every repository has the same synthetic PRs with the same files, PR N
+touches files ``src/moduleK/...`` and ``docs/moduleK/...``. Responses are
+paginated by Link headers, carry ETags and honour If-None-Match, every
+request waits the configured latency.
+
+    python benchmarks/fakegithub.py --prs 500 --files 50 --latency 0.05
+
+Request counts are served on ``/_stats`` and cleared by ``POST /_reset``.
+Repos named ``missing*`` do not exist and label writes to repos named
+``locked*`` are forbidden, so failures can be tested.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+from collections import Counter
+from urllib import parse
+
+from aiohttp import web
+
+
+class FakeGitHub:
+    """
+    Synthetic GitHub API state
+    """
+
+    def __init__(self, prs, files, latency, labels=20, repos=10):
+        """Server state constructor
+
+        :param prs: Number of PRs of every repo
+        :type prs: int
+        :param files: Number of files of every PR
+        :type files: int
+        :param latency: Latency of every request in seconds
+        :type latency: float
+        :param labels: Number of modules files are spread across
+        :type labels: int
+        :param repos: Number of repos listed for every organization or user
+        :type repos: int
+        """
+
+        self.prCount = prs
+        self.fileCount = files
+        self.latency = latency
+        self.modules = labels
+        self.repoCount = repos
+        self.labels = {}
+        self.counts = Counter()
+
+    def baseUrl(self, request):
+        """API URL as seen by client
+        """
+        return F'{request.scheme}://{request.host}/'
+
+    def pr(self, request, user, repo, number):
+        """REST PR object
+        """
+        base = self.baseUrl(request)
+        return {
+            'number': number,
+            'url': F'{base}repos/{user}/{repo}/pulls/{number}',
+            'issue_url': F'{base}repos/{user}/{repo}/issues/{number}',
+            'html_url': F'https://github.com/{user}/{repo}/pull/{number}',
+            'state': 'open',
+            'title': F'Synthetic PR {number}',
+            'body': 'x' * 512,
+            'updated_at': self.updatedAt(number),
+            'labels': [{'name': name} for name in sorted(self.labels.get((user, repo, number), []))],
+            'user': {'login': 'author', 'id': number},
+            'head': {'sha': F'head{number}', 'ref': F'feature{number}',
+                     'repo': {'full_name': F'fork/{repo}'}},
+            'base': {'sha': 'base', 'ref': 'master',
+                     'repo': {'full_name': F'{user}/{repo}'}},
+        }
+
+    def updatedAt(self, number):
+        """Last update time of PR
+        """
+        return '2019-01-{:02d}T00:00:00Z'.format(28 - number % 28)
+
+    def numbers(self, updated=False):
+        """PR numbers, newest first or last updated first
+        """
+        numbers = range(1, self.prCount + 1)
+        if updated:
+            return sorted(numbers, key=self.updatedAt, reverse=True)
+        return list(numbers)
+
+    def fileNames(self, number):
+        """File paths of PR
+        """
+        return ['{}/module{}/file{}.py'.format('src' if i % 2 else 'docs',
+                                               (number + i) % self.modules, i)
+                for i in range(self.fileCount)]
+
+    async def enter(self, request):
+        """Count request and wait latency
+        """
+        self.counts[request.method + ' ' + request.match_info.route.resource.canonical] += 1
+        self.counts['total'] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def page(self, request, items):
+        """Paginated response with Link header and ETag
+        """
+
+        perPage = int(request.query.get('per_page', 30))
+        number = int(request.query.get('page', 1))
+        last = max(1, (len(items) + perPage - 1) // perPage)
+        headers = {}
+        if number < last:
+            query = dict(request.query)
+            url = str(request.url.with_query(None))
+            links = []
+            for rel, page in (('next', number + 1), ('last', last)):
+                query['page'] = str(page)
+                links.append('<{}?{}>; rel="{}"'.format(url, parse.urlencode(query), rel))
+            headers['Link'] = ', '.join(links)
+        return self.json(request, items[(number - 1) * perPage:number * perPage], headers)
+
+    def json(self, request, obj, headers=None):
+        """JSON response with ETag, 304 if client has it
+        """
+        headers = dict(headers or {})
+        body = json.dumps(obj)
+        headers['ETag'] = '"{}"'.format(hashlib.md5(body.encode('utf-8')).hexdigest())
+        if request.headers.get('If-None-Match') == headers['ETag']:
+            self.counts['304'] += 1
+            return web.Response(status=304, headers=headers)
+        return web.Response(text=body, content_type='application/json', headers=headers)
+
+    async def user(self, request):
+        await self.enter(request)
+        return self.json(request, {'login': 'benchmark'})
+
+    async def repos(self, request):
+        await self.enter(request)
+        owner = request.match_info.get('owner', 'benchmark')
+        return self.page(request, [{
+            'name': F'repo{i}',
+            'full_name': F'{owner}/repo{i}',
+            'owner': {'login': owner},
+            'archived': i == self.repoCount - 1,
+            'topics': ['even'] if i % 2 == 0 else ['odd'],
+        } for i in range(self.repoCount)])
+
+    def forbidden(self, request):
+        """Error response of label write to locked repo
+        """
+        if request.match_info['repo'].startswith('locked'):
+            return web.json_response({'message': 'Must have admin rights'}, status=403)
+        return None
+
+    async def pulls(self, request):
+        await self.enter(request)
+        user, repo = request.match_info['user'], request.match_info['repo']
+        if repo.startswith('missing'):
+            return web.json_response({'message': 'Not Found'}, status=404)
+        updated = request.query.get('sort') == 'updated'
+        return self.page(request, [self.pr(request, user, repo, number)
+                                   for number in self.numbers(updated)])
+
+    async def files(self, request):
+        await self.enter(request)
+        number = int(request.match_info['number'])
+        return self.page(request, [{'filename': name, 'status': 'modified', 'additions': 1,
+                                    'deletions': 1, 'patch': '@@ -1 +1 @@'}
+                                   for name in self.fileNames(number)])
+
+    def issueLabels(self, request):
+        """Labels of PR from request path
+        """
+        key = (request.match_info['user'], request.match_info['repo'],
+               int(request.match_info['number']))
+        return key, self.labels.setdefault(key, set())
+
+    async def putLabels(self, request):
+        await self.enter(request)
+        denied = self.forbidden(request)
+        if denied is not None:
+            return denied
+        key, labels = self.issueLabels(request)
+        self.labels[key] = set(await request.json())
+        return web.json_response([{'name': name} for name in sorted(self.labels[key])])
+
+    async def postLabels(self, request):
+        await self.enter(request)
+        denied = self.forbidden(request)
+        if denied is not None:
+            return denied
+        key, labels = self.issueLabels(request)
+        labels.update(await request.json())
+        return web.json_response([{'name': name} for name in sorted(labels)])
+
+    async def deleteLabel(self, request):
+        await self.enter(request)
+        denied = self.forbidden(request)
+        if denied is not None:
+            return denied
+        key, labels = self.issueLabels(request)
+        name = request.match_info['name']
+        if name not in labels:
+            return web.json_response({'message': 'Label does not exist'}, status=404)
+        labels.discard(name)
+        return web.json_response([{'name': name} for name in sorted(labels)])
+
+    async def graphql(self, request):
+        await self.enter(request)
+        variables = (await request.json())['variables']
+        user, repo = variables['owner'], variables['name']
+        if repo.startswith('missing'):
+            return web.json_response({'data': {'repository': None}})
+        start = int(variables['after'] or 0)
+        numbers = self.numbers(variables.get('order') == 'UPDATED_AT')[start:start + variables['first']]
+        nodes = []
+        for number in numbers:
+            names = self.fileNames(number)
+            nodes.append({
+                'number': number,
+                'url': F'https://github.com/{user}/{repo}/pull/{number}',
+                'headRefOid': F'head{number}',
+                'baseRefOid': 'base',
+                'updatedAt': self.updatedAt(number),
+                'labels': {'pageInfo': {'hasNextPage': False},
+                           'nodes': [{'name': name} for name in sorted(self.labels.get((user, repo, number), []))]},
+                'files': {'pageInfo': {'hasNextPage': len(names) > variables['files']},
+                          'nodes': [{'path': name} for name in names[:variables['files']]]},
+            })
+        end = start + len(numbers)
+        return web.json_response({'data': {'repository': {'pullRequests': {
+            'pageInfo': {'hasNextPage': end < self.prCount, 'endCursor': str(end)},
+            'nodes': nodes}}}})
+
+    async def stats(self, request):
+        return web.json_response(self.counts)
+
+    async def reset(self, request):
+        self.counts.clear()
+        self.labels.clear()
+        return web.json_response({})
+
+    def application(self):
+        """aiohttp application with all routes
+        """
+        app = web.Application()
+        app.router.add_get('/user', self.user)
+        app.router.add_get('/orgs/{owner}/repos', self.repos)
+        app.router.add_get('/users/{owner}/repos', self.repos)
+        app.router.add_get('/user/repos', self.repos)
+        app.router.add_get('/repos/{user}/{repo}/pulls', self.pulls)
+        app.router.add_get('/repos/{user}/{repo}/pulls/{number}/files', self.files)
+        app.router.add_put('/repos/{user}/{repo}/issues/{number}/labels', self.putLabels)
+        app.router.add_post('/repos/{user}/{repo}/issues/{number}/labels', self.postLabels)
+        app.router.add_delete('/repos/{user}/{repo}/issues/{number}/labels/{name}', self.deleteLabel)
+        app.router.add_post('/graphql', self.graphql)
+        app.router.add_get('/_stats', self.stats)
+        app.router.add_post('/_reset', self.reset)
+        return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--prs', type=int, default=100)
+    parser.add_argument('--files', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--repos', type=int, default=10)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    server = FakeGitHub(args.prs, args.files, args.latency, repos=args.repos)
+    web.run_app(server.application(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == '__main__':
+    main()
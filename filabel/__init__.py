@@ -1,4 +1,20 @@
-from .cli import main
-from .web import app
+__all__ = ['main', 'app']
 
-__all__ = ['main', 'app']
\ No newline at end of file
+
+def __getattr__(name):
+    """Import CLI and web app on first access, so importing one
+    does not load dependencies of the other
+
+    :param name: Attribute name
+    :type name: string
+    :return: attribute
+    :rtype: object
+    """
+
+    if name == 'main':
+        from .cli import main
+        return main
+    if name == 'app':
+        from .web import app
+        return app
+    raise AttributeError(F"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,253 @@
+import asyncio
+import json
+import os
+import signal
+import sys
+
+import click
+import jinja2
+from aiohttp import web
+
+from .github import GitHubAsync
+from .jobs import AsyncJobQueue, QueueFull
+from .scheduler import RateLimitScheduler
+from .cache import LabelCache
+from .metrics import Metrics
+from .records import PullRequest
+from .webhook import (ConfigSnapshot, configMtimes, readConfigsFromEnv, checkSignature,
+                      isRelabelAction)
+
+
+TEMPLATES = jinja2.Environment(loader=jinja2.PackageLoader('filabel', 'templates'),
+                               autoescape=True)
+"""
+Templates shared with Flask app
+"""
+
+
+class WebhookServer:
+    """
+    Webhook server running on asyncio
+
+    Same routes and configuration as Flask app in filabel.web, PRs are
+    labeled by GitHubAsync in worker tasks of single event loop, so one
+    process serves hundreds of concurrent deliveries. Blocking work
+    (configuration loading and username lookup) runs in executor.
+    """
+
+    def __init__(self):
+        """
+        Server constructor, configuration is loaded on startup
+        """
+        self.snapshot = None
+        self.brokenMtimes = None
+        self.retired = []
+        self.labelCache = None
+        self.metrics = Metrics()
+        self.maxConcurrency = int(os.environ.get('FILABEL_MAX_CONCURRENCY', 32))
+        self.jobs = AsyncJobQueue(self.label,
+                                  int(os.environ.get('FILABEL_WORKERS', 100)),
+                                  int(os.environ.get('FILABEL_QUEUE_SIZE', 1000)))
+        self.reloadRequested = None
+        self.watcher = None
+
+    def parseConfigsFromEnv(self, previous=None):
+        """Load config from ENV variable, blocking
+
+        :param previous: Current snapshot, its client is kept if token did not change
+        :type previous: ConfigSnapshot or none
+        :raises Exception: Configuration not usable
+        :return: loaded configuration
+        :rtype: ConfigSnapshot
+        """
+
+        token, secret, labels, mtimes = readConfigsFromEnv()
+        if previous is not None and previous.token == token:
+            github = previous.github
+        else:
+            github = GitHubAsync(token, scheduler=RateLimitScheduler(self.maxConcurrency),
+                                 labelCache=self.labelCache, metrics=self.metrics)
+        return ConfigSnapshot(token, secret, labels, github, mtimes)
+
+    async def reloadConfig(self, force=False):
+        """Swap config snapshot if configuration files changed, broken
+        configuration is reported once and current snapshot is kept
+
+        :param force: Reload even if files did not change
+        :type force: bool
+        """
+
+        snapshot = self.snapshot
+        mtimes = configMtimes(list(snapshot.mtimes))
+        if not force and mtimes in (snapshot.mtimes, self.brokenMtimes):
+            return
+        loop = asyncio.get_event_loop()
+        try:
+            self.snapshot = await loop.run_in_executor(None, self.parseConfigsFromEnv, snapshot)
+            if self.snapshot.github is not snapshot.github:
+                # Jobs in flight may still use old client, it is closed on cleanup
+                self.retired.append(snapshot.github)
+            print('Configuration reloaded', file=sys.stderr)
+        except Exception as err:
+            self.brokenMtimes = mtimes
+            print(F'Configuration not reloaded - {err}', file=sys.stderr)
+
+    async def watchConfig(self, interval):
+        """Reload config when files change or SIGHUP is received
+
+        :param interval: Seconds between modification time checks
+        :type interval: float
+        """
+
+        while True:
+            try:
+                await asyncio.wait_for(self.reloadRequested.wait(), interval)
+                force = True
+            except asyncio.TimeoutError:
+                force = False
+            self.reloadRequested.clear()
+            await self.reloadConfig(force)
+
+    async def startup(self, app):
+        """
+        Load config and start job queue and config watcher
+        """
+        if 'FILABEL_CACHE_DIR' in os.environ:
+            self.labelCache = LabelCache(os.path.join(os.environ['FILABEL_CACHE_DIR'], 'labels'),
+                                         int(os.environ.get('FILABEL_CACHE_SIZE', 256)) * 1024 * 1024,
+                                         int(os.environ.get('FILABEL_CACHE_MAX_AGE', 30)) * 24 * 3600)
+
+        loop = asyncio.get_event_loop()
+        self.snapshot = await loop.run_in_executor(None, self.parseConfigsFromEnv)
+        self.jobs.start()
+
+        self.reloadRequested = asyncio.Event()
+        try:
+            loop.add_signal_handler(signal.SIGHUP, self.reloadRequested.set)
+        except (NotImplementedError, RuntimeError, AttributeError):
+            pass
+        self.watcher = asyncio.ensure_future(
+            self.watchConfig(float(os.environ.get('FILABEL_RELOAD_INTERVAL', 2))))
+
+    async def cleanup(self, app):
+        """
+        Stop workers and watcher, close clients
+        """
+        self.watcher.cancel()
+        await asyncio.gather(self.watcher, return_exceptions=True)
+        await self.jobs.stop()
+        for github in [self.snapshot.github] + self.retired:
+            await github.close()
+
+    async def index(self, request):
+        """
+        Show Help on intro page
+        """
+
+        snapshot = self.snapshot
+        text = TEMPLATES.get_template('index.html').render(
+            name=snapshot.github.username, labels=snapshot.labels)
+        return web.Response(text=text, content_type='text/html')
+
+    async def metricsPage(self, request):
+        """
+        Runtime metrics in Prometheus text format
+        """
+
+        self.metrics.gauge('filabel_queue_depth', self.jobs.depth)
+        return web.Response(text=self.metrics.render(),
+                            headers={'Content-Type': 'text/plain; version=0.0.4'})
+
+    async def label(self, pr):
+        """
+        Label PR from event payload, called by job queue worker
+        """
+
+        snapshot = self.snapshot
+        await snapshot.github.processPR(pr, snapshot.matcher, False)
+
+    async def webhook(self, request):
+        """
+        Web github webhook endpoint
+        """
+
+        if request.content_type != 'application/json' and not request.content_type.endswith('+json'):
+            raise web.HTTPBadRequest(text="Content is not json")
+
+        headers = request.headers
+
+        event = headers.get('X-GitHub-Event')
+        if event is None:
+            raise web.HTTPBadRequest(text="X-GitHub-Event is missing")
+
+        signature = headers.get('X-Hub-Signature')
+        if signature is None:
+            raise web.HTTPBadRequest(text="X-Hub-Signature is missing")
+
+        data = await request.read()
+        if not checkSignature(signature, data, self.snapshot.secret):
+            raise web.HTTPBadRequest(text="Signature is wrong")
+
+        try:
+            content = json.loads(data)
+        except ValueError:
+            raise web.HTTPBadRequest(text="Content is not json")
+
+        if event == 'ping':
+            zen = content['zen']
+            print(F'Received Ping - {zen}')
+            return web.Response(text=F'Pong - {zen}')
+        elif event == 'pull_request':
+            reposlug = content['repository']['full_name']
+            number = content['pull_request']['number']
+            action = content.get('action')
+            print(F'Pull request Event - {reposlug}#{number} {action}')
+            if not isRelabelAction(content):
+                return web.Response(text=F"Ignored - {reposlug}#{number} {action}")
+            try:
+                status = self.jobs.submit((reposlug, number),
+                                          PullRequest.fromJson(content['pull_request']),
+                                          headers.get('X-GitHub-Delivery'))
+            except QueueFull as err:
+                raise web.HTTPServiceUnavailable(text=str(err))
+            return web.Response(text=F"Accepted ({status}) - {reposlug}#{number}", status=202)
+        else:
+            raise web.HTTPBadRequest(text="Unknown event")
+
+    def application(self):
+        """Create aiohttp application
+
+        :return: application
+        :rtype: aiohttp.web.Application
+        """
+
+        app = web.Application()
+        app.router.add_get('/', self.index)
+        app.router.add_get('/metrics', self.metricsPage)
+        app.router.add_post('/', self.webhook)
+        app.router.add_post('/webhook', self.webhook)
+        app.on_startup.append(self.startup)
+        app.on_cleanup.append(self.cleanup)
+        return app
+
+
+def createApp(argv=None):
+    """Create application, entry point of python -m aiohttp.web
+
+    :param argv: Command line arguments
+    :type argv: list or none
+    :return: application
+    :rtype: aiohttp.web.Application
+    """
+
+    return WebhookServer().application()
+
+
+@click.command()
+@click.option('--host', show_default=True, default='127.0.0.1', help='Interface to listen on.')
+@click.option('--port', type=click.IntRange(min=0), show_default=True, default=8080, help='Port to listen on.')
+def main(host, port):
+    """
+    Asyncio webhook server for filename-pattern-based labeling of GitHub PRs
+    """
+    web.run_app(createApp(), host=host, port=port)
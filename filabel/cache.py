@@ -0,0 +1,256 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class DiskCache:
+    """
+    Size bounded on-disk JSON store with LRU eviction
+
+    Every entry is one file named by its key, file modification time is
+    used as last access time, so the LRU order survives between runs.
+    """
+
+    def __init__(self, directory, maxSize=256 * 1024 * 1024, maxAge=None):
+        """Cache constructor
+
+        :param directory: Cache directory, it is created if missing
+        :type directory: string
+        :param maxSize: Maximal total size in bytes
+        :type maxSize: int
+        :param maxAge: Maximal entry age in seconds
+        :type maxAge: float or none
+        """
+
+        self.directory = directory
+        self.maxSize = maxSize
+        self.maxAge = maxAge
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.size = 0
+        os.makedirs(directory, exist_ok=True)
+        self.load()
+
+    @staticmethod
+    def key(*parts):
+        """Create key from JSON serializable parts
+
+        :return: key
+        :rtype: string
+        """
+
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        """Get entry file path
+
+        :param key: Entry key
+        :type key: string
+        :return: path
+        :rtype: string
+        """
+
+        return os.path.join(self.directory, key + '.json')
+
+    def load(self):
+        """
+        Load index of stored entries ordered by last access
+        """
+        found = []
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if item.is_file() and item.name.endswith('.json'):
+                    stat = item.stat()
+                    found.append((stat.st_mtime, item.name[:-5], stat.st_size))
+        for mtime, key, size in sorted(found):
+            self.entries[key] = (mtime, size)
+            self.size += size
+        with self.lock:
+            self.evict()
+
+    def get(self, key):
+        """Get entry
+
+        :param key: Entry key
+        :type key: string
+        :return: stored object
+        :rtype: object or none
+        """
+
+        with self.lock:
+            if key not in self.entries:
+                return None
+            mtime, size = self.entries[key]
+            if self.maxAge is not None and time.time() - mtime > self.maxAge:
+                self.remove(key)
+                return None
+            self.entries.move_to_end(key)
+
+        try:
+            with open(self.path(key), encoding='utf-8') as file:
+                obj = json.load(file)
+            os.utime(self.path(key))
+        except (OSError, ValueError):
+            with self.lock:
+                self.remove(key)
+            return None
+        return obj
+
+    def set(self, key, obj):
+        """Store entry
+
+        :param key: Entry key
+        :type key: string
+        :param obj: JSON serializable object
+        :type obj: object
+        """
+
+        data = json.dumps(obj, separators=(',', ':')).encode('utf-8')
+        tmp = '{}.{}.{}.tmp'.format(self.path(key), os.getpid(), threading.get_ident())
+        try:
+            with open(tmp, 'wb') as file:
+                file.write(data)
+            os.replace(tmp, self.path(key))
+        except OSError:
+            return
+
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+            self.entries[key] = (time.time(), len(data))
+            self.size += len(data)
+            self.evict()
+
+    def remove(self, key):
+        """Remove entry, caller holds the lock, entry may be already
+        removed by another thread reading it outside the lock
+
+        :param key: Entry key
+        :type key: string
+        """
+
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= entry[1]
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+
+    def evict(self):
+        """
+        Remove least recently used and expired entries, caller holds the lock
+        """
+        now = time.time()
+        while self.entries:
+            key, (mtime, size) = next(iter(self.entries.items()))
+            expired = self.maxAge is not None and now - mtime > self.maxAge
+            if self.size <= self.maxSize and not expired:
+                break
+            self.remove(key)
+
+
+class HttpCache(DiskCache):
+    """
+    Conditional request cache storing validators and bodies of GET responses
+    """
+
+    def lookup(self, token, url, params):
+        """Find cached response and its conditional headers
+
+        :param token: github api token, responses differ per user
+        :type token: string
+        :param url: Address of endpoint
+        :type url: string
+        :param params: Query parameters
+        :type params: dict or none
+        :return: key, cached entry and request headers
+        :rtype: tuple
+        """
+
+        key = self.key(hashlib.sha256(token.encode('utf-8')).hexdigest(),
+                       url, sorted((params or {}).items()))
+        entry = self.get(key)
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('lastModified'):
+                headers['If-Modified-Since'] = entry['lastModified']
+        return key, entry, headers
+
+    def store(self, key, headers, links, data):
+        """Store response if it has validator
+
+        :param key: Entry key
+        :type key: string
+        :param headers: Response headers
+        :type headers: mapping
+        :param links: Link header urls by relation
+        :type links: dict
+        :param data: Parsed JSON body
+        :type data: object
+        """
+
+        etag = headers.get('ETag')
+        lastModified = headers.get('Last-Modified')
+        if etag is None and lastModified is None:
+            return
+        self.set(key, {'etag': etag, 'lastModified': lastModified,
+                       'links': links, 'data': data})
+
+
+class LabelCache(DiskCache):
+    """
+    Computed labels of PRs keyed by PR commits and labels definition
+    """
+
+    def prKey(self, pr, digest):
+        """Create key of PR labels
+
+        :param pr: PR
+        :type pr: PullRequest
+        :param digest: Labels definition digest
+        :type digest: string
+        :return: key, none if PR commits are unknown
+        :rtype: string or none
+        """
+
+        if None in (pr.reposlug, pr.headSha, pr.baseSha):
+            return None
+        return self.key(pr.reposlug, pr.number, pr.headSha, pr.baseSha, digest)
+
+    def lookup(self, key):
+        """Get cached labels
+
+        :param key: PR key
+        :type key: string or none
+        :return: labels and whether files list was truncated
+        :rtype: tuple or none
+        """
+
+        if key is None:
+            return None
+        entry = self.get(key)
+        if entry is None:
+            return None
+        return set(entry['labels']), entry.get('truncated', False)
+
+    def store(self, key, labels, truncated=False):
+        """Store computed labels
+
+        :param key: PR key
+        :type key: string or none
+        :param labels: Computed labels
+        :type labels: set
+        :param truncated: Labels were computed from truncated files list
+        :type truncated: bool
+        """
+
+        if key is None:
+            return
+        self.set(key, {'labels': sorted(labels), 'truncated': truncated})
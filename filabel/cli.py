@@ -2,8 +2,12 @@ import click
 import os
 import configparser
 import sys
-import asyncio
-from .github import GitHub,GitHubAsync
+import datetime
+from collections import deque
+from .matcher import LabelMatcher
+
+# Backends are imported by functions using them, so --help and invalid
+# configuration do not pay for importing HTTP libraries.
 
 def loadAuth(path):
     """ Load guthub api token form file
@@ -63,6 +67,227 @@ def parseReposlugs(reposlugs):
     return result
 
 
+def parseReposLine(line, rejected):
+    """Split line of repos file to user repo pair, invalid line is reported
+    
+    :param line: Line with reposlug, empty or comment
+    :type line: string
+    :param rejected: Invalid lines are appended to it
+    :type rejected: list
+    :return: user repo pair
+    :rtype: list or none
+    """
+
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    tmp = line.split('/')
+    if len(tmp) != 2:
+        print(F"Reposlug {line} not valid!", file=sys.stderr)
+        rejected.append(line)
+        return None
+    return tmp
+
+
+def iterReposlugs(github, reposlugs, reposFile, owners, filters, rejected):
+    """Iterate repos given by arguments, repos file and discovered ones
+    
+    :param github: Client used for discovery
+    :type github: GitHub or none
+    :param reposlugs: user repo pairs
+    :type reposlugs: list
+    :param reposFile: File with reposlug per line
+    :type reposFile: file or none
+    :param owners: Owner name and whether it is organization pairs
+    :type owners: list
+    :param filters: Discovery filters
+    :type filters: dict
+    :param rejected: Invalid lines and owners whose repos cannot be listed are appended to it
+    :type rejected: list
+    :return: user repo pairs
+    :rtype: iterator
+    """
+
+    yield from reposlugs
+    if reposFile is not None:
+        for line in reposFile:
+            item = parseReposLine(line, rejected)
+            if item is not None:
+                yield item
+    for owner, org in owners:
+        try:
+            yield from github.iterRepos(owner, org, **filters)
+        except Exception:
+            print(F"Repos of {owner} cannot be listed!", file=sys.stderr)
+            rejected.append(owner)
+
+
+async def aiterReposlugs(github, reposlugs, reposFile, owners, filters, rejected):
+    """Async Iterate repos given by arguments, repos file and discovered ones,
+    file is read in thread so slow stdin does not block event loop
+    
+    :param github: Client used for discovery
+    :type github: GitHubAsync
+    :param reposlugs: user repo pairs
+    :type reposlugs: list
+    :param reposFile: File with reposlug per line
+    :type reposFile: file or none
+    :param owners: Owner name and whether it is organization pairs
+    :type owners: list
+    :param filters: Discovery filters
+    :type filters: dict
+    :param rejected: Invalid lines and owners whose repos cannot be listed are appended to it
+    :type rejected: list
+    :return: user repo pairs
+    :rtype: async iterator
+    """
+
+    import asyncio
+
+    for item in reposlugs:
+        yield item
+    if reposFile is not None:
+        loop = asyncio.get_event_loop()
+        while True:
+            line = await loop.run_in_executor(None, reposFile.readline)
+            if not line:
+                break
+            item = parseReposLine(line, rejected)
+            if item is not None:
+                yield item
+    for owner, org in owners:
+        try:
+            async for item in github.iterRepos(owner, org, **filters):
+                yield item
+        except Exception:
+            print(F"Repos of {owner} cannot be listed!", file=sys.stderr)
+            rejected.append(owner)
+
+
+def parseSince(ctx, param, value):
+    """Normalize ISO 8601 time to UTC format used by GitHub
+    
+    :param value: Time, UTC if zone is missing
+    :type value: string or none
+    :raises click.BadParameter: Time not valid
+    :return: time
+    :rtype: string or none
+    """
+
+    if value is None:
+        return None
+    try:
+        parsed = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise click.BadParameter("Time must be in ISO 8601 format, e.g. 2019-01-31T12:00:00Z")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.astimezone(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def repoSince(watermarks, reposlug, digest, since):
+    """Get lower bound of PR update time of repo
+    
+    Watermark is used only if it was saved with same labels configuration,
+    otherwise all PRs since given time are relabeled.
+
+    :param watermarks: Saved watermarks by reposlug
+    :type watermarks: dict
+    :param reposlug: Repo name with owner
+    :type reposlug: string
+    :param digest: Labels configuration digest
+    :type digest: string
+    :param since: Time given by option
+    :type since: string or none
+    :return: time
+    :rtype: string or none
+    """
+
+    entry = watermarks.get(reposlug)
+    if entry is None or entry['labels'] != digest:
+        return since
+    return max(entry['updated'], since or '')
+
+
+def saveWatermarks(path, watermarks, updated, digest):
+    """Save newest PR update time of fully labeled repos
+    
+    :param path: Watermarks file path
+    :type path: string
+    :param watermarks: Saved watermarks by reposlug
+    :type watermarks: dict
+    :param updated: Newest PR update time by reposlug
+    :type updated: dict
+    :param digest: Labels configuration digest
+    :type digest: string
+    """
+
+    from .shard import saveState
+
+    for reposlug, time in updated.items():
+        watermarks[reposlug] = {'updated': time, 'labels': digest}
+    saveState(path, watermarks)
+
+
+def createClient(settings, output, metrics=None, profiler=None):
+    """Create client for selected mode
+    
+    :param settings: Client settings
+    :type settings: dict
+    :param output: Results output
+    :type output: Output or none
+    :param metrics: Runtime metrics
+    :type metrics: Metrics or none
+    :param profiler: Run profiler
+    :type profiler: Profiler or none
+    :return: client
+    :rtype: GitHub or GitHubAsync
+    """
+
+    from .cache import HttpCache, LabelCache
+    from .journal import Journal
+
+    cache = None
+    labelCache = None
+    if settings['cacheDir'] is not None:
+        cacheSize = settings['cacheSize'] * 1024 * 1024
+        cache = HttpCache(os.path.join(settings['cacheDir'], 'http'), cacheSize)
+        labelCache = LabelCache(os.path.join(settings['cacheDir'], 'labels'), cacheSize,
+                                settings['cacheMaxAge'] * 24 * 3600)
+    journal = None
+    if settings['checkpoint'] is not None:
+        journal = Journal(settings['checkpoint'])
+
+    if settings['mode'] == 'sync':
+        from .github import GitHub
+        return GitHub(settings['token'], settings['poolSize'], settings['poolSizePerHost'],
+                      cache, settings['dryRun'], labelCache, output, metrics, profiler, journal,
+                      settings['threads'])
+
+    from .scheduler import RateLimitScheduler
+    if settings['mode'] == 'graphql':
+        from .graphql import GitHubGraphQL as client
+    else:
+        from .github import GitHubAsync as client
+    return client(settings['token'], settings['poolSize'], settings['poolSizePerHost'],
+                  RateLimitScheduler(settings['maxConcurrency']), cache,
+                  settings['dryRun'], labelCache, output, metrics, profiler, journal)
+
+
+def printWrites(github):
+    """Print label writes summary to stderr
+    
+    :param github: Used client
+    :type github: GitHub or GitHubAsync
+    """
+
+    click.echo("Label writes: {} sent, {} saved{}".format(
+        github.writesSent, github.writesSaved,
+        " (dry run)" if github.dryRun else ""), err=True)
+    if github.journal is not None:
+        click.echo("Skipped {} PRs completed by previous run".format(github.skipped), err=True)
+
+
 @click.command()
 @click.option('-s', '--state', type=click.Choice(['open', 'closed', 'all']), show_default=True, default='open', help='Filter pulls by state.')
 @click.option('-d/-D', '--delete-old/--no-delete-old', 'delete', show_default=True, default=True, help='Delete labels that do not match anymore.')
@@ -70,32 +295,145 @@ def parseReposlugs(reposlugs):
 @click.option('-a', '--config-auth', 'auth', type=click.File('rb'), required=True, help='File with authorization configuration.')
 @click.option('-l', '--config-labels', 'label', type=click.File('rb'), required=True, help=' File with labels configuration.')
 @click.option('-x', '--async', 'asyncFlag',  is_flag=True, help='Use asynchronnous (faster) logic.')
+@click.option('-g', '--graphql', 'graphqlFlag', is_flag=True, help='Use batched GraphQL queries (implies async).')
+@click.option('--pool-size', 'poolSize', type=click.IntRange(min=0), show_default=True, default=100, help='Maximal number of pooled connections (0 unlimited in async mode).')
+@click.option('--pool-size-per-host', 'poolSizePerHost', type=click.IntRange(min=0), show_default=True, default=0, help='Maximal number of pooled connections per host (0 unlimited).')
+@click.option('--threads', type=click.IntRange(min=1), show_default=True, default=1, help='Number of threads processing PRs in sync mode.')
+@click.option('--max-concurrency', 'maxConcurrency', type=click.IntRange(min=1), show_default=True, default=32, help='Maximal number of in-flight requests in async mode.')
+@click.option('--cache-dir', 'cacheDir', type=click.Path(file_okay=False), default=None, help='Directory for conditional requests cache.')
+@click.option('--cache-size', 'cacheSize', type=click.IntRange(min=1), show_default=True, default=256, help='Maximal size of each cache in MB.')
+@click.option('--cache-max-age', 'cacheMaxAge', type=click.IntRange(min=1), show_default=True, default=30, help='Maximal age of cached PR labels in days.')
+@click.option('--dry-run', 'dryRun', is_flag=True, help='Print planned label writes without sending them.')
+@click.option('--ordered/--unordered', 'ordered', show_default=True, default=True, help='Keep order of repos and PRs in output or print results as they finish.')
+@click.option('-j', '--jobs', type=click.IntRange(min=1), show_default=True, default=1, help='Number of worker processes repos are spread across.')
+@click.option('--stats', is_flag=True, help='Print GitHub API usage statistics at the end.')
+@click.option('--profile', 'profilePath', type=click.Path(dir_okay=False, writable=True), default=None, help='Profile the run, save pstats to file and print summary.')
+@click.option('--org', 'orgs', multiple=True, metavar='NAME', help='Label all repos of organization (can be repeated).')
+@click.option('--user', 'users', multiple=True, metavar='NAME', help='Label all repos owned by user (can be repeated).')
+@click.option('--repo-filter', 'repoFilter', default=None, metavar='GLOB', help='Filter discovered repos by name (owner/name if it contains slash).')
+@click.option('--topic', 'topics', multiple=True, help='Filter discovered repos by topic (can be repeated).')
+@click.option('--archived/--no-archived', show_default=True, default=False, help='Include archived discovered repos.')
+@click.option('--repos-file', 'reposFile', type=click.File('r'), default=None, help='File with reposlug per line, - for stdin.')
+@click.option('--checkpoint', type=click.Path(dir_okay=False, writable=True), default=None, help='Journal of completed PRs, they are skipped when run is resumed.')
+@click.option('--since', callback=parseSince, default=None, metavar='TIME', help='Label only PRs updated since ISO 8601 time.')
+@click.option('--incremental', is_flag=True, help='Label only PRs updated since previous run of each repo (needs --cache-dir).')
+@click.option('--output', 'outputFormat', type=click.Choice(['text', 'ndjson']), show_default=True, default='text', help='Print results as styled text or JSON record per repo and PR.')
 @click.argument('reposlugs', nargs=-1)
-def main(state, delete, branch, auth, label, asyncFlag, reposlugs):
+def main(state, delete, branch, auth, label, asyncFlag, graphqlFlag, poolSize, poolSizePerHost, threads, maxConcurrency, cacheDir, cacheSize, cacheMaxAge, dryRun, ordered, jobs, stats, profilePath, orgs, users, repoFilter, topics, archived, reposFile, checkpoint, since, incremental, outputFormat, reposlugs):
     """
     CLI tool for filename-pattern-based labeling of GitHub PRs
     """
     reposlug = parseReposlugs(reposlugs)
 
     token = loadAuth(auth.name)
-    labels = loadLabels(label.name)
-    
+    labelsDefinition = loadLabels(label.name)
+    labels = LabelMatcher(labelsDefinition)
+
+    settings = {
+        'token': token,
+        'mode': 'graphql' if graphqlFlag else 'async' if asyncFlag else 'sync',
+        'poolSize': poolSize,
+        'poolSizePerHost': poolSizePerHost,
+        'threads': threads,
+        'maxConcurrency': maxConcurrency,
+        'cacheDir': cacheDir,
+        'cacheSize': cacheSize,
+        'cacheMaxAge': cacheMaxAge,
+        'dryRun': dryRun,
+        'stats': stats,
+        'checkpoint': checkpoint,
+        'output': outputFormat,
+    }
+    owners = [(org, True) for org in orgs] + [(user, False) for user in users]
+    filters = {'pattern': repoFilter, 'topics': topics, 'archived': archived}
+
+    watermarksPath = None
+    watermarks = {}
+    if incremental:
+        if cacheDir is None:
+            print("Incremental mode needs --cache-dir!", file=sys.stderr)
+            sys.exit(1)
+        os.makedirs(cacheDir, exist_ok=True)
+        watermarksPath = os.path.join(cacheDir, 'watermarks.json')
+        from .shard import loadState
+        watermarks = loadState(watermarksPath)
+
+    def sinceOf(user, repo):
+        return repoSince(watermarks, F"{user}/{repo}", labels.digest, since)
+
+    # Invalid repos file lines fail the run like invalid reposlugs, after other repos are labeled
+    rejected = []
+
+    if jobs > 1:
+        if profilePath is not None:
+            print("Profiling is not supported with multiple jobs!", file=sys.stderr)
+            sys.exit(1)
+        from .github import GitHub
+        from .shard import runSharded
+        if reposFile is not None or owners:
+            reposlug = list(iterReposlugs(GitHub(token) if owners else None,
+                                          reposlug, reposFile, owners, filters, rejected))
+        ok, updated = runSharded(reposlug, settings, labelsDefinition, state, branch, delete,
+                                 jobs, ordered, [sinceOf(*item) for item in reposlug])
+        if watermarksPath is not None:
+            saveWatermarks(watermarksPath, watermarks, updated, labels.digest)
+        sys.exit(0 if ok and not rejected else 1)
+
+    from .output import Output, NdjsonOutput
+    from .metrics import Metrics
+    if outputFormat == 'ndjson':
+        output = NdjsonOutput(ordered=ordered)
+    else:
+        output = Output(ordered=ordered)
+    metrics = Metrics() if stats else None
+    profiler = None
+    if profilePath is not None:
+        from .profiler import Profiler
+        profiler = Profiler()
+    if profiler is not None:
+        profiler.start()
+
     async def task():
-        github = GitHubAsync(token)
-        futures=[]
-        for item in reposlug:
-            future = asyncio.ensure_future(github.processRepo(item[0], item[1], state, branch, labels, delete))
-            futures.append(future)
+        github = createClient(settings, output, metrics, profiler)
+        try:
+            futures = deque()
+            async for item in aiterReposlugs(github, reposlug, reposFile, owners, filters, rejected):
+                if len(futures) >= github.REPO_WINDOW:
+                    await futures.popleft()
+                future = asyncio.ensure_future(github.processRepo(item[0], item[1], state, branch, labels, delete, output.slot(), sinceOf(*item)))
+                futures.append(future)
 
-        for item in futures:
-            click.echo(await item)
+            while futures:
+                await futures.popleft()
+        finally:
+            await github.close()
+        return github
 
-    if asyncFlag:
+    if settings['mode'] != 'sync':
+        import asyncio
         loop = asyncio.get_event_loop()
-        result = loop.run_until_complete(task())
+        github = loop.run_until_complete(task())
         loop.close()
     else:
-        github = GitHub(token)
-        for item in reposlug:
-            github.processRepo(item[0], item[1], state, branch, labels, delete)
+        github = createClient(settings, output, metrics, profiler)
+        try:
+            for item in iterReposlugs(github, reposlug, reposFile, owners, filters, rejected):
+                github.processRepo(item[0], item[1], state, branch, labels, delete, since=sinceOf(*item))
+        finally:
+            github.close()
 
+    output.close()
+    if watermarksPath is not None:
+        saveWatermarks(watermarksPath, watermarks, github.watermarks, labels.digest)
+    if github.journal is not None:
+        github.journal.close()
+    if profiler is not None:
+        profiler.stop()
+    printWrites(github)
+    if metrics is not None:
+        click.echo(metrics.summary(), err=True)
+    if profiler is not None:
+        click.echo(profiler.report(profilePath), err=True)
+    # Same rule as multiple jobs, any failed repo or PR or rejected input fails the run
+    if github.failed or github.failedRepos or rejected:
+        sys.exit(1)
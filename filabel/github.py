@@ -1,13 +1,26 @@
 import click
 import os
 import configparser
-import requests
 import fnmatch
 import sys
-import asyncio
-import aiohttp
 import re
+import time
+import itertools
+import threading
+import contextvars
+from collections import deque
 from urllib import parse
+from .matcher import compileLabels
+from .planner import LabelPlan
+from .records import pullRequests, filePaths
+from .output import Output, tally, countRequest, encodeRecord
+from .metrics import NULL_METRICS
+from .profiler import NULL_PROFILER
+
+try:
+    from orjson import loads as loadJson
+except ImportError:
+    from json import loads as loadJson
 
 def getLabels(source, path):
     """Get all labels for given path
@@ -58,6 +71,190 @@ def getPagesAddress(next, last):
     except Exception as err:
         print(err)
 
+def getReposAddress(baseUrl, owner, org, username):
+    """Get address and parameters of repositories listing, own
+    repositories are listed by authenticated endpoint to include private ones
+    
+    :param baseUrl: GitHub API URL
+    :type baseUrl: string
+    :param owner: Organization or user name
+    :type owner: string
+    :param org: Owner is organization
+    :type org: bool
+    :param username: Authenticated user
+    :type username: string
+    :return: address and parameters
+    :rtype: tuple
+    """
+
+    if org:
+        return baseUrl + F"orgs/{owner}/repos", {'per_page': 100, 'type': 'all'}
+    if owner == username:
+        return baseUrl + "user/repos", {'per_page': 100, 'affiliation': 'owner'}
+    return baseUrl + F"users/{owner}/repos", {'per_page': 100, 'type': 'owner'}
+
+
+def matchRepo(repo, pattern=None, topics=(), archived=False):
+    """Check discovered repository against filters
+    
+    :param repo: Repository
+    :type repo: repository object
+    :param pattern: Name glob, matched with owner if it contains slash
+    :type pattern: string or none
+    :param topics: Repository has at least one of topics, any if empty
+    :type topics: tuple
+    :param archived: Include archived repositories
+    :type archived: bool
+    :return: Repository passes filters
+    :rtype: bool
+    """
+
+    if repo.get('archived') and not archived:
+        return False
+    if pattern is not None:
+        name = repo['full_name'] if '/' in pattern else repo['name']
+        if not fnmatch.fnmatchcase(name, pattern):
+            return False
+    if topics and not set(topics) & set(repo.get('topics') or ()):
+        return False
+    return True
+
+
+FILES_LIMIT = 3000
+"""
+Maximal number of files GitHub lists for one PR
+"""
+
+
+def filesTruncated(pr, count):
+    """Check PR has more files than were listed
+    
+    :param pr: PR
+    :type pr: PullRequest
+    :param count: Number of listed files
+    :type count: int
+    :return: Files list is truncated
+    :rtype: bool
+    """
+
+    if pr.changedFiles is not None:
+        return pr.changedFiles > count
+    return count >= FILES_LIMIT
+
+
+def parseJson(text):
+    """Parse JSON body, empty or invalid body is None
+    
+    :param text: body
+    :type text: string or bytes
+    :return: parsed object
+    :rtype: dict or list or None
+    """
+
+    if not text:
+        return None
+    try:
+        return loadJson(text)
+    except ValueError:
+        return None
+
+COLORS = {'+': 'green', '-': 'red'}
+"""
+Colors of added and removed labels
+"""
+
+def formatMutation(method, labels):
+    """Format planned label write
+    
+    :param method: HTTP method
+    :type method: string
+    :param labels: Written labels
+    :type labels: list
+    :return: formated click style text
+    :rtype: string
+    """
+
+    return click.style("{} {}".format(method, ', '.join(labels)), fg='yellow')
+
+def writeRepo(slot, reposlug, ok, summary=None):
+    """Write repo result, text is written when repo starts or fails,
+    NDJSON record once repo is finished
+    
+    :param slot: Output slot
+    :type slot: Slot
+    :param reposlug: Reposlug
+    :type reposlug: string
+    :param ok: Repo was processed
+    :type ok: bool
+    :param summary: Counts and tally values of finished repo, none when repo starts or fails
+    :type summary: dict or none
+    """
+
+    if slot.output.ndjson:
+        if summary is not None:
+            slot.write(encodeRecord({'type': 'repo', 'repo': reposlug,
+                                     'status': 'ok' if ok else 'fail', **summary}))
+        return
+    if summary is not None:
+        return
+
+    slot.write("{} {} - {}\n".format(format("repo"), reposlug,
+                                      format("ok" if ok else "fail")))
+
+def writePR(slot, indent, pr, plan=None, dryRun=False, truncated=False, current=None):
+    """Write PR result with its label changes
+    
+    :param slot: Output slot
+    :type slot: Slot
+    :param indent: PR line indentation
+    :type indent: string
+    :param pr: PR
+    :type pr: PullRequest
+    :param plan: Label writes, none if PR failed
+    :type plan: LabelPlan or none
+    :param dryRun: Write also planned label writes
+    :type dryRun: bool
+    :param truncated: Labels were computed from truncated files list
+    :type truncated: bool
+    :param current: Tally of PR for NDJSON record
+    :type current: Tally or none
+    """
+
+    if slot.output.ndjson:
+        record = {'type': 'pr', 'repo': pr.reposlug, 'number': pr.number, 'url': pr.htmlUrl,
+                  'status': 'fail' if plan is None else 'ok'}
+        if plan is not None:
+            record['added'] = sorted(plan.add)
+            record['removed'] = sorted(plan.remove) if plan.delete else []
+            record['kept'] = sorted(plan.known)
+            record['truncated'] = truncated
+            record['writes'] = plan.mutations
+            record['dryRun'] = dryRun
+        if current is not None:
+            record.update(current.summary())
+        slot.write(encodeRecord(record))
+        return
+
+    url = pr.htmlUrl
+    if plan is None:
+        slot.write("{}{} {} - {}\n".format(indent, format("pr"), url, format("fail")))
+        return
+
+    lines = ["{}{} {} - {}{}\n".format(indent, format("pr"), url, format("ok"),
+                                      " (files truncated)" if truncated else "")]
+    for label, sign in plan.changes():
+        if sign == '=':
+            lines.append("{}  {} {}\n".format(indent, sign, label))
+        else:
+            lines.append(click.style("{}  {} {}".format(
+                indent, sign, label), fg=COLORS[sign]) + '\n')
+
+    if dryRun:
+        for method, mutation in plan.mutations:
+            lines.append(indent + "  " + formatMutation(method, mutation) + '\n')
+
+    slot.write(''.join(lines))
+
 def format(text):
     """Format all OK,FAIL,PR,REPO words
     
@@ -81,6 +278,30 @@ def format(text):
         raise Exception("Unkown text")
 
 
+class Response:
+    """
+    Downloaded HTTP response
+    """
+
+    def __init__(self, status, headers, links, data):
+        """Response constructor
+
+        :param status: HTTP status
+        :type status: int
+        :param headers: Response headers
+        :type headers: mapping
+        :param links: Link header urls by relation
+        :type links: dict
+        :param data: Parsed JSON body
+        :type data: dict or list or None
+        """
+
+        self.status = status
+        self.headers = headers
+        self.links = links
+        self.data = data
+
+
 class GitHubAsync:
     """
     GitHub object for async PRs labeling 
@@ -92,14 +313,82 @@ class GitHubAsync:
     """
 
 
-    def __init__(self, token):
+    RETRIES = 3
+    """
+    Number of retries of throttled or failed request
+    """
+
+    INDENT = ''
+    """
+    PR line indentation
+    """
+
+    PR_WINDOW = 100
+    """
+    Maximal number of PRs of one repo processed at once
+    """
+
+    PAGE_PREFETCH = 4
+    """
+    Number of pages downloaded in advance
+    """
+
+    REPO_WINDOW = 20
+    """
+    Maximal number of repos processed at once
+    """
+
+    def __init__(self, token, limit=100, limitPerHost=0, scheduler=None, cache=None, dryRun=False,
+                 labelCache=None, output=None, metrics=None, profiler=None,
+                 journal=None):
         """GH constructor
         
         :param token: github api token
         :type token: string
+        :param limit: Maximal number of pooled connections (0 unlimited)
+        :type limit: int
+        :param limitPerHost: Maximal number of pooled connections per host (0 unlimited)
+        :type limitPerHost: int
+        :param scheduler: Requests scheduler
+        :type scheduler: RateLimitScheduler or none
+        :param cache: Conditional requests cache
+        :type cache: HttpCache or none
+        :param dryRun: Plan label writes without sending them
+        :type dryRun: bool
+        :param labelCache: Computed labels cache
+        :type labelCache: LabelCache or none
+        :param output: Results output, ordered stdout by default
+        :type output: Output or none
+        :param metrics: Runtime metrics, disabled by default
+        :type metrics: Metrics or none
+        :param profiler: Run profiler, disabled by default
+        :type profiler: Profiler or none
+        :param journal: Checkpoint of completed PRs, they are skipped
+        :type journal: Journal or none
         """
 
         self.token = token
+        self.limit = limit
+        self.limitPerHost = limitPerHost
+        self.asyncSession = None
+        if scheduler is None:
+            from .scheduler import RateLimitScheduler
+            scheduler = RateLimitScheduler()
+        self.scheduler = scheduler
+        self.cache = cache
+        self.dryRun = dryRun
+        self.labelCache = labelCache
+        self.output = output if output is not None else Output()
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
+        self.journal = journal
+        self.processed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.failedRepos = 0
+        self.watermarks = {}
+        self.writesSent = 0
+        self.writesSaved = 0
         self.getUserName()
 
     def getUserName(self):
@@ -115,6 +404,8 @@ class GitHubAsync:
         """
         Create Session with predefined github auth header
         """
+        import requests
+
         session = requests.Session()
 
         def token_auth(req):
@@ -127,11 +418,87 @@ class GitHubAsync:
         """
         Create Async Session with predefined github auth header
         """
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            ssl=False, limit=self.limit, limit_per_host=self.limitPerHost)
         session = aiohttp.ClientSession(
-            headers={"Authorization": F'token {self.token}'}, connector=aiohttp.TCPConnector(verify_ssl=False))
+            headers={"Authorization": F'token {self.token}'}, connector=connector)
         return session
 
-    async def processRepo(self, user, repo, state, base, labels, delete):
+    def getAsyncSession(self):
+        """
+        Get shared Async Session, it is created on first use
+        """
+        if self.asyncSession is None or self.asyncSession.closed:
+            self.asyncSession = self.createAsyncSession()
+        return self.asyncSession
+
+    async def close(self):
+        """
+        Close shared Async Session and its connections
+        """
+        if self.asyncSession is not None:
+            await self.asyncSession.close()
+            self.asyncSession = None
+
+    async def request(self, method, url, **kwargs):
+        """Async scheduled HTTP request, throttled requests are retried
+
+        :param method: HTTP method
+        :type method: string
+        :param url: Address of endpoint
+        :type url: string
+        :return: Response
+        :rtype: Response
+        """
+
+        import asyncio
+        import aiohttp
+
+        key = entry = None
+        if method == 'GET' and self.cache is not None:
+            key, entry, headers = self.cache.lookup(
+                self.token, url, kwargs.get('params'))
+            kwargs['headers'] = {**kwargs.get('headers', {}), **headers}
+
+        begin = time.monotonic()
+        for attempt in range(self.RETRIES + 1):
+            await self.scheduler.acquire()
+            start = time.monotonic()
+            countRequest()
+            try:
+                async with self.getAsyncSession().request(method, url, **kwargs) as response:
+                    text = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                self.scheduler.onError()
+                self.metrics.inc('filabel_http_errors_total')
+                if attempt == self.RETRIES:
+                    raise
+                continue
+            finally:
+                await self.scheduler.release()
+
+            latency = time.monotonic() - start
+            self.metrics.request(method, url, response.status, latency, response.headers)
+            throttled = self.scheduler.onResponse(
+                response.status, response.headers, latency)
+            if throttled and attempt < self.RETRIES:
+                continue
+
+            self.profiler.request(url, time.monotonic() - begin)
+            if response.status == 304 and entry is not None:
+                return Response(200, response.headers, entry['links'], entry['data'])
+
+            links = {rel: str(value['url'])
+                     for rel, value in response.links.items()}
+            with self.profiler.cpu('parse JSON'):
+                data = parseJson(text)
+            if response.status == 200 and key is not None:
+                self.cache.store(key, response.headers, links, data)
+            return Response(response.status, response.headers, links, data)
+
+    async def processRepo(self, user, repo, state, base, labels, delete, slot=None, since=None):
         """Async Label all PRs in given repo
         
         :param user: Repo's owner
@@ -143,35 +510,97 @@ class GitHubAsync:
         :param base: Filter by base name
         :type base: string or none
         :param labels: Labels
-        :type labels: dict
+        :type labels: LabelMatcher
         :param delete: Delete if additional label exist
         :type delete: bool
-        :return: Text output
-        :rtype: string
+        :param slot: Output slot, new one is reserved if none
+        :type slot: Slot or none
+        :param since: Only PRs updated since ISO 8601 time, all if none
+        :type since: string or none
+        :return: PRs were listed
+        :rtype: bool
         """
 
-        stdout = ''
-        try:
-            PRs = await self.getPR(user, repo, state, base)
-            stdout = "{} {} - {}".format(format("repo"),
-                                         F"{user}/{repo}", format("ok"))+'\n'
-            futures = []
-            for pr in PRs:
-                future = asyncio.ensure_future(
-                    self.processPR(pr, labels, delete))
-                futures.append(future)
-
-            for item in futures:
-                stdout = stdout + await item
-        except:
-            stdout = "{} {} - {}".format(format("repo"),
-                                         F"{user}/{repo}", format("fail"))+'\n'
-
-        return stdout.rstrip()
+        import asyncio
+
+        if slot is None:
+            slot = self.output.slot()
+        with self.profiler.repo(F"{user}/{repo}"), tally() as current:
+            futures = deque()
+            running = set()
+            newest = None
+            failed = processed = skipped = 0
+            ok = True
+
+            async def startPR(pr, prSlot):
+                running.add(pr)
+                return await self.processPR(pr, labels, delete, prSlot)
+
+            try:
+                labels = compileLabels(labels)
+                started = False
+                async for pr in self.iterPR(user, repo, state, base, since):
+                    if not started:
+                        writeRepo(slot, F"{user}/{repo}", True)
+                        started = True
+                    newest = max(newest or pr.updatedAt, pr.updatedAt)
+                    if self.journal is not None and self.journal.done(pr, labels.digest):
+                        self.releasePR(pr)
+                        self.skipped += 1
+                        skipped += 1
+                        continue
+                    if len(futures) >= self.PR_WINDOW:
+                        failed += not await futures.popleft()[0]
+                    prSlot = slot.slot()
+                    future = asyncio.ensure_future(startPR(pr, prSlot))
+                    futures.append((future, prSlot, pr))
+                    processed += 1
+
+                if not started:
+                    writeRepo(slot, F"{user}/{repo}", True)
+                while futures:
+                    failed += not await futures.popleft()[0]
+                if not failed and newest is not None:
+                    self.watermarks[F"{user}/{repo}"] = newest
+            except asyncio.CancelledError:
+                for future, prSlot, pr in futures:
+                    future.cancel()
+                    self.releasePR(pr)
+                    prSlot.close()
+                ok = False
+                raise
+            except Exception:
+                # Started PRs finish their label writes like in sync mode,
+                # PRs not started yet never reach end of processPR
+                waiting = []
+                for future, prSlot, pr in futures:
+                    if pr in running:
+                        waiting.append(future)
+                    else:
+                        future.cancel()
+                        self.releasePR(pr)
+                        prSlot.close()
+                        processed -= 1
+                results = await asyncio.gather(*waiting, return_exceptions=True)
+                failed += sum(result is not True for result in results)
+                writeRepo(slot, F"{user}/{repo}", False)
+                self.failedRepos += 1
+                ok = False
+            finally:
+                writeRepo(slot, F"{user}/{repo}", ok, {
+                    'prs': processed, 'failed': failed, 'skipped': skipped, **current.summary()})
+                slot.close()
+            return ok
+
+    def releasePR(self, pr):
+        """Release data kept for PR which is not going to be processed
 
-    
-    async def getPR(self, user, repo, state, base):
-        """Async Get PRs for given repo
+        :param pr: PR
+        :type pr: PullRequest
+        """
+
+    async def iterPR(self, user, repo, state, base, since=None):
+        """Async Iterate PRs for given repo page by page
         
         :param user: Repo's owner
         :type user: string
@@ -181,9 +610,11 @@ class GitHubAsync:
         :type state: string
         :param base: Filter by base name
         :type base: string or none
+        :param since: Only PRs updated since ISO 8601 time, all if none
+        :type since: string or none
         :raises Exception: PRs get failed
         :return: PRs
-        :rtype: list of prs
+        :rtype: async iterator of prs
         """
 
         reqParams = {'per_page': 100}
@@ -193,29 +624,116 @@ class GitHubAsync:
         if base is not None:
             reqParams['base'] = base
 
+        if since is not None:
+            reqParams['sort'] = 'updated'
+            reqParams['direction'] = 'desc'
+
         url = self.BASE_URL + F"repos/{user}/{repo}/pulls"
-        PRs = []
-
-        async with self.createAsyncSession() as session:
-            async with session.get(url, params=reqParams) as response:
-                reqParams = {}
-                if response.status != 200:
-                    raise Exception("PR get failed")
-                obj = await response.json()
-                PRs.extend(obj)
-                if 'next' not in response.links:
-                    return PRs
-        futures = []
+
+        response = await self.request('GET', url, params=reqParams)
+        if response.status != 200:
+            raise Exception("PR get failed")
+        while since is not None:
+            for pr in pullRequests(response.data):
+                if pr.updatedAt < since:
+                    return
+                yield pr
+            if 'next' not in response.links:
+                return
+            response = await self.request('GET', response.links['next'])
+            if response.status != 200:
+                raise Exception("PR get failed")
+
+        for pr in pullRequests(response.data):
+            yield pr
+        if 'next' not in response.links:
+            return
+
+        addresses = getPagesAddress(
+            response.links['next'], response.links['last'])
+        async for page in self.iterPages(addresses):
+            for pr in pullRequests(page):
+                yield pr
+
+    async def getPR(self, user, repo, state, base, since=None):
+        """Async Get PRs for given repo
+        
+        :param user: Repo's owner
+        :type user: string
+        :param repo: Repo name
+        :type repo: string
+        :param state: Filter PR state (open|close|all)
+        :type state: string
+        :param base: Filter by base name
+        :type base: string or none
+        :param since: Only PRs updated since ISO 8601 time, all if none
+        :type since: string or none
+        :raises Exception: PRs get failed
+        :return: PRs
+        :rtype: list of prs
+        """
+
+        return [pr async for pr in self.iterPR(user, repo, state, base, since)]
+
+    async def iterRepos(self, owner, org, pattern=None, topics=(), archived=False):
+        """Async Iterate repositories of organization or user page by page
+        
+        :param owner: Organization or user name
+        :type owner: string
+        :param org: Owner is organization
+        :type org: bool
+        :param pattern: Name glob, matched with owner if it contains slash
+        :type pattern: string or none
+        :param topics: Repository has at least one of topics, any if empty
+        :type topics: tuple
+        :param archived: Include archived repositories
+        :type archived: bool
+        :raises Exception: Repos get failed
+        :return: user repo pairs
+        :rtype: async iterator of tuples
+        """
+
+        url, reqParams = getReposAddress(self.BASE_URL, owner, org, self.username)
+        response = await self.request('GET', url, params=reqParams)
+        if response.status != 200:
+            raise Exception("Repos get failed")
+        for repo in response.data:
+            if matchRepo(repo, pattern, topics, archived):
+                yield repo['owner']['login'], repo['name']
+        if 'next' not in response.links:
+            return
+
         addresses = getPagesAddress(
-            response.links['next']['url'], response.links['last']['url'])
-        for address in addresses:
-            future = asyncio.ensure_future(self.getJson(address))
-            futures.append(future)
+            response.links['next'], response.links['last'])
+        async for page in self.iterPages(addresses):
+            for repo in page:
+                if matchRepo(repo, pattern, topics, archived):
+                    yield repo['owner']['login'], repo['name']
+
+    async def iterPages(self, addresses):
+        """Async Iterate downloaded pages in order, few following pages are downloaded in advance
+        
+        :param addresses: Addresses of pages
+        :type addresses: list
+        :raises Exception: Get failed
+        :return: pages
+        :rtype: async iterator of lists
+        """
 
-        for future in futures:
-            PRs.extend(await future)
+        import asyncio
 
-        return PRs
+        addresses = iter(addresses)
+        futures = deque(asyncio.ensure_future(self.getJson(address))
+                        for address in itertools.islice(addresses, self.PAGE_PREFETCH))
+        try:
+            while futures:
+                page = await futures.popleft()
+                for address in itertools.islice(addresses, 1):
+                    futures.append(asyncio.ensure_future(self.getJson(address)))
+                yield page
+        finally:
+            for future in futures:
+                future.cancel()
 
     async def getJson(self, address):
         """Download and parse JSON
@@ -227,130 +745,223 @@ class GitHubAsync:
         :rtype: dict
         """
 
-        async with self.createAsyncSession() as session:
-            async with session.get(address) as response:
-                if response.status != 200:
-                    raise Exception("Get failed")
-                return await response.json()
+        response = await self.request('GET', address)
+        if response.status != 200:
+            raise Exception("Get failed")
+        return response.data
 
 
-    async def processPR(self, pr, labels, delete):
+    async def processPR(self, pr, labels, delete, slot=None):
         """Async Set correct labels for PR
         
         :param pr: PR
-        :type pr: PR object
+        :type pr: PullRequest
         :param labels: Labels
-        :type labels: dict
+        :type labels: LabelMatcher
         :param delete: Delete if additional label exist
         :type delete: bool
-        :return: Text output
-        :rtype: string
+        :param slot: Output slot, new one is reserved if none
+        :type slot: Slot or none
+        :return: PR was labeled
+        :rtype: bool
         """
 
-        stdout = ''
-        try:
-            files = await self.getPRFiles(pr)
-            calculatedLabels = set()
-            for file in files:
-                for label in getLabels(labels, file["filename"]):
-                    calculatedLabels.add(label)
+        if slot is None:
+            slot = self.output.slot()
+        self.processed += 1
+        with tally() as current:
+            try:
+                labels = compileLabels(labels)
+                calculatedLabels, truncated = await self.calculateLabels(pr, labels)
+
+                with self.profiler.cpu('plan writes'):
+                    prLabels = set(pr.labels)
+                    plan = LabelPlan(prLabels, calculatedLabels, labels.names,
+                                     delete and not truncated)
+
+                await self.applyPlan(pr, plan)
+                self.countPR(plan)
+                if self.journal is not None and not self.dryRun:
+                    self.journal.record(pr, labels.digest)
+
+                with self.profiler.cpu('format output'):
+                    writePR(slot, self.INDENT, pr, plan, self.dryRun, truncated, current)
+            except Exception:
+                self.metrics.inc('filabel_prs_processed_total', (('status', 'fail'),))
+                self.failed += 1
+                writePR(slot, self.INDENT, pr, current=current)
+                return False
+            finally:
+                slot.close()
+            return True
+
+    def countPR(self, plan):
+        """Record processed PR and its label changes
+        
+        :param plan: Label writes
+        :type plan: LabelPlan
+        """
 
-            prLabels = {label['name'] for label in pr['labels']}
-            labelsAvailable = set(labels.keys())
-            labelsAdd = calculatedLabels - prLabels
-            labelsToRemove = (prLabels & labelsAvailable) - calculatedLabels
-            labelsKnown = ((prLabels & labelsAvailable) -
-                           labelsAdd) - labelsToRemove
+        if not self.metrics.enabled:
+            return
+        self.metrics.inc('filabel_prs_processed_total', (('status', 'ok'),))
+        self.metrics.inc('filabel_labels_added_total', value=len(plan.add))
+        if plan.delete:
+            self.metrics.inc('filabel_labels_removed_total', value=len(plan.remove))
 
-            labelsFinal = set(prLabels | labelsAdd)
+    async def calculateLabels(self, pr, labels):
+        """Async Get labels matching PR files, cached result skips files download
+        
+        Pages of files are matched as they are downloaded, paging stops
+        once all labels match.
 
-            if delete:
-                labelsFinal = labelsFinal - labelsToRemove
+        :param pr: PR
+        :type pr: PullRequest
+        :param labels: Labels
+        :type labels: LabelMatcher
+        :return: Labels and whether files list was truncated
+        :rtype: tuple
+        """
 
-            await self.updateLabels(pr, labelsFinal)
+        key = None
+        if self.labelCache is not None:
+            key = self.labelCache.prKey(pr, labels.digest)
+            cached = self.labelCache.lookup(key)
+            if cached is not None:
+                return cached
+
+        calculatedLabels = set()
+        count = 0
+        complete = False
+        pages = self.iterPRFiles(pr)
+        try:
+            async for page in pages:
+                count += len(page)
+                with self.profiler.cpu('compute labels'):
+                    calculatedLabels |= labels.matchFiles(page)
+                if calculatedLabels >= labels.names:
+                    complete = True
+                    break
+        finally:
+            await pages.aclose()
+        truncated = not complete and filesTruncated(pr, count)
+
+        if self.labelCache is not None:
+            self.labelCache.store(key, calculatedLabels, truncated)
+        return calculatedLabels, truncated
+
+    async def applyPlan(self, pr, plan):
+        """Async Send planned label writes, nothing is sent in dry run
+        
+        :param pr: PR
+        :type pr: PullRequest
+        :param plan: Label writes
+        :type plan: LabelPlan
+        """
 
-            stdout = "{} {} - {}".format(format("pr"),
-                                         pr['html_url'], format("ok")) + '\n'
+        self.writesSaved += plan.saved
+        if self.dryRun:
+            return
 
-            labels = []
+        for method, labels in plan.mutations:
+            if method == 'PUT':
+                await self.updateLabels(pr, labels)
+            elif method == 'POST':
+                await self.addLabels(pr, labels)
+            else:
+                await self.removeLabel(pr, labels[0])
+            self.writesSent += 1
 
-            if delete:
-                for label in labelsToRemove:
-                    labels.append([label, '-', 'red'])
+    async def updateLabels(self, pr, labels):
+        """Async Set labels for PR
+        
+        :param pr: PR
+        :type pr: PullRequest
+        :param labels: labels
+        :type labels: list
+        :raises Exception: Settings failed
+        """
 
-            for label in labelsAdd:
-                labels.append([label, '+', 'green'])
+        data = list(labels)
+        url = F"{pr.issueUrl}/labels"
 
-            for label in labelsKnown:
-                labels.append([label, '='])
+        response = await self.request('PUT', url, json=data)
+        if response.status != 200:
+            raise Exception("Update labels failed")
 
-            labels.sort(key=lambda x: x[0])
+    async def addLabels(self, pr, labels):
+        """Async Add labels to PR
+        
+        :param pr: PR
+        :type pr: PullRequest
+        :param labels: labels
+        :type labels: list
+        :raises Exception: Settings failed
+        """
 
-            for label in labels:
-                if label[1] == '=':
-                    stdout = stdout + \
-                        "  {} {}".format(label[1], label[0]) + '\n'
-                else:
-                    stdout = stdout + click.style("  {} {}".format(
-                        label[1], label[0]), fg=label[2]) + '\n'
+        url = F"{pr.issueUrl}/labels"
 
-        except Exception:
-            stdout = stdout + "{} {} - {}".format(format("pr"),
-                                                  pr['html_url'], format("fail"))+'\n'
-        return stdout
+        response = await self.request('POST', url, json=list(labels))
+        if response.status != 200:
+            raise Exception("Add labels failed")
 
-    async def updateLabels(self, pr, labels):
-        """Async Set labels for PR
+    async def removeLabel(self, pr, label):
+        """Async Remove label from PR
         
         :param pr: PR
-        :type pr: PR object
-        :param labels: labels
-        :type labels: list
+        :type pr: PullRequest
+        :param label: label
+        :type label: string
         :raises Exception: Settings failed
         """
 
-        data = list(labels)
-        url = F"{pr['issue_url']}/labels"
+        url = F"{pr.issueUrl}/labels/{parse.quote(label, safe='')}"
 
-        async with self.createAsyncSession() as session:
-            async with session.put(url, json=data) as response:
-                obj = await response.text()
-                if response.status != 200:
-                    raise Exception("Update labels failed")
+        response = await self.request('DELETE', url)
+        # Label already removed by hand or by concurrent job
+        if response.status not in (200, 404):
+            raise Exception("Remove label failed")
 
 
     async def getPRFiles(self, pr):
         """Async Get All Files for PR
         
         :param pr: PR
-        :type pr: PR object
+        :type pr: PullRequest
         :raises Exception: Get Failed
-        :return: Files objects
+        :return: File paths
         :rtype: list
         """
 
-        url = F"{pr['url']}/files"
-        files = []
+        return [file async for page in self.iterPRFiles(pr) for file in page]
+
+    async def iterPRFiles(self, pr):
+        """Async Iterate pages of PR files
+        
+        :param pr: PR
+        :type pr: PullRequest
+        :raises Exception: Get Failed
+        :return: pages of file paths
+        :rtype: async iterator of lists
+        """
+
+        url = F"{pr.url}/files"
         reqParams = {'per_page': 100}
-        async with self.createAsyncSession() as session:
-            async with session.get(url, params=reqParams) as response:
-                obj = await response.json()
-                if response.status != 200:
-                    raise Exception("File get failed")
-                files.extend(obj)
-                if 'next' not in response.links:
-                    return files
-
-        futures = []
-        addresses = getPagesAddress(
-            response.links['next']['url'], response.links['last']['url'])
-        for address in addresses:
-            future = asyncio.ensure_future(self.getJson(address))
-            futures.append(future)
+        response = await self.request('GET', url, params=reqParams)
+        if response.status != 200:
+            raise Exception("File get failed")
+        yield filePaths(response.data)
+        if 'next' not in response.links:
+            return
 
-        for future in futures:
-            files.extend(await future)
-        return files
+        addresses = getPagesAddress(
+            response.links['next'], response.links['last'])
+        pages = self.iterPages(addresses)
+        try:
+            async for page in pages:
+                yield filePaths(page)
+        finally:
+            await pages.aclose()
 
 
 class GitHub:
@@ -363,13 +974,72 @@ class GitHub:
     GitHub API URL
     """
 
-    def __init__(self, token):
+    INDENT = '  '
+    """
+    PR line indentation
+    """
+
+    PR_WINDOW = 100
+    """
+    Maximal number of PRs of one repo processed at once by threads
+    """
+
+    PAGE_PREFETCH = 4
+    """
+    Number of pages downloaded in advance by threads
+    """
+
+    def __init__(self, token, limit=10, limitPerHost=0, cache=None, dryRun=False, labelCache=None,
+                 output=None, metrics=None, profiler=None, journal=None, threads=1):
         """GH constructor
         
         :param token: github api token
         :type token: string
+        :param limit: Maximal number of pooled connections (0 default)
+        :type limit: int
+        :param limitPerHost: Maximal number of pooled connections per host (0 default)
+        :type limitPerHost: int
+        :param cache: Conditional requests cache
+        :type cache: HttpCache or none
+        :param dryRun: Plan label writes without sending them
+        :type dryRun: bool
+        :param labelCache: Computed labels cache
+        :type labelCache: LabelCache or none
+        :param output: Results output, ordered stdout by default
+        :type output: Output or none
+        :param metrics: Runtime metrics, disabled by default
+        :type metrics: Metrics or none
+        :param profiler: Run profiler, disabled by default
+        :type profiler: Profiler or none
+        :param journal: Checkpoint of completed PRs, they are skipped
+        :type journal: Journal or none
+        :param threads: Number of threads processing PRs and downloading pages
+        :type threads: int
         """
         self.token = token
+        self.limit = limit
+        self.limitPerHost = limitPerHost
+        self.cache = cache
+        self.dryRun = dryRun
+        self.labelCache = labelCache
+        self.output = output if output is not None else Output()
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
+        self.journal = journal
+        self.processed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.failedRepos = 0
+        self.watermarks = {}
+        self.writesSent = 0
+        self.writesSaved = 0
+        self.lock = threading.Lock()
+        self.executor = self.pageExecutor = None
+        if threads > 1:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self.executor = ThreadPoolExecutor(threads, 'filabel-pr')
+            self.pageExecutor = ThreadPoolExecutor(threads, 'filabel-page')
         self.session = self.createSession()
         self.getUserName()
 
@@ -377,16 +1047,56 @@ class GitHub:
         """
         Get Username from token
         """
-        response = self.session.get(self.BASE_URL+"user")
-        if not response.ok:
+        response = self.request('GET', self.BASE_URL+"user")
+        if response.status != 200:
             raise Exception("Cannot get username")
-        self.username = response.json()['login']
+        self.username = response.data['login']
+
+    def request(self, method, url, **kwargs):
+        """HTTP request, GET responses are revalidated from cache
+
+        :param method: HTTP method
+        :type method: string
+        :param url: Address of endpoint
+        :type url: string
+        :return: Response
+        :rtype: Response
+        """
+
+        key = entry = None
+        if method == 'GET' and self.cache is not None:
+            key, entry, headers = self.cache.lookup(
+                self.token, url, kwargs.get('params'))
+            kwargs['headers'] = {**kwargs.get('headers', {}), **headers}
+
+        start = time.monotonic()
+        response = self.session.request(method, url, **kwargs)
+        latency = time.monotonic() - start
+        with self.lock:
+            countRequest()
+        self.metrics.request(method, url, response.status_code, latency, response.headers)
+        self.profiler.request(url, latency)
+        if response.status_code == 304 and entry is not None:
+            return Response(200, response.headers, entry['links'], entry['data'])
+
+        links = {rel: value['url'] for rel, value in response.links.items()}
+        with self.profiler.cpu('parse JSON'):
+            data = parseJson(response.content)
+        if response.status_code == 200 and key is not None:
+            self.cache.store(key, response.headers, links, data)
+        return Response(response.status_code, response.headers, links, data)
 
     def createSession(self):
         """
         Create Session with predefined github auth header
         """
+        import requests.adapters
+
         session = requests.Session()
+        poolSize = min(filter(None, (self.limit, self.limitPerHost)), default=10)
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=poolSize)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
 
         def token_auth(req):
             req.headers['Authorization'] = F'token {self.token}'
@@ -394,8 +1104,16 @@ class GitHub:
         session.auth = token_auth
         return session
 
-    
-    def processRepo(self, user, repo, state, base, labels, delete):
+    def close(self):
+        """
+        Stop threads and close session connections
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.pageExecutor.shutdown()
+        self.session.close()
+
+    def processRepo(self, user, repo, state, base, labels, delete, slot=None, since=None):
         """Label all PRs in given repo
         
         :param user: Repo's owner
@@ -407,26 +1125,89 @@ class GitHub:
         :param base: Filter by base name
         :type base: string or none
         :param labels: Labels
-        :type labels: dict
+        :type labels: LabelMatcher
         :param delete: Delete if additional label exist
         :type delete: bool
+        :param slot: Output slot, new one is reserved if none
+        :type slot: Slot or none
+        :param since: Only PRs updated since ISO 8601 time, all if none
+        :type since: string or none
+        :return: PRs were listed
+        :rtype: bool
+        """
+        if slot is None:
+            slot = self.output.slot()
+        with self.profiler.repo(F"{user}/{repo}"), tally() as current:
+            futures = deque()
+            failed = processed = skipped = 0
+            ok = True
+            try:
+
+                PRs = self.iterPR(user, repo, state, base, since)
+                first = list(itertools.islice(PRs, 1))
+
+                writeRepo(slot, F"{user}/{repo}", True)
+
+                labels = compileLabels(labels)
+                newest = None
+                for pr in itertools.chain(first, PRs):
+                    newest = max(newest or pr.updatedAt, pr.updatedAt)
+                    if self.journal is not None and self.journal.done(pr, labels.digest):
+                        with self.lock:
+                            self.skipped += 1
+                        skipped += 1
+                        continue
+                    processed += 1
+                    if self.executor is None:
+                        failed += not self.processPR(pr, labels, delete, slot.slot())
+                        continue
+                    if len(futures) >= self.PR_WINDOW:
+                        failed += not futures.popleft()[0].result()
+                    prSlot = slot.slot()
+                    # PR thread counts its requests also to tally of repo
+                    futures.append((self.executor.submit(
+                        contextvars.copy_context().run,
+                        self.processPR, pr, labels, delete, prSlot), prSlot))
+                while futures:
+                    failed += not futures.popleft()[0].result()
+                if not failed and newest is not None:
+                    self.watermarks[F"{user}/{repo}"] = newest
+            except:
+                for future, prSlot in futures:
+                    if future.cancel():
+                        prSlot.close()
+                writeRepo(slot, F"{user}/{repo}", False)
+                self.failedRepos += 1
+                ok = False
+            finally:
+                writeRepo(slot, F"{user}/{repo}", ok, {
+                    'prs': processed, 'failed': failed, 'skipped': skipped, **current.summary()})
+                slot.close()
+            return ok
+
+
+    def getPR(self, user, repo, state, base, since=None):
+        """Get PRs for given repo
+        
+        :param user: Repo's owner
+        :type user: string
+        :param repo: Repo name
+        :type repo: string
+        :param state: Filter PR state (open|close|all)
+        :type state: string
+        :param base: Filter by base name
+        :type base: string or none
+        :param since: Only PRs updated since ISO 8601 time, all if none
+        :type since: string or none
+        :raises Exception: PRs get failed
+        :return: PRs
+        :rtype: list of prs
         """
-        try:
-
-            PRs = self.getPR(user, repo, state, base)
-
-            click.echo("{} {} - {}".format(format("repo"),
-                                           F"{user}/{repo}", format("ok")))
-
-            for pr in PRs:
-                self.processPR(pr, labels, delete)
-        except:
-            click.echo("{} {} - {}".format(format("repo"),
-                                           F"{user}/{repo}", format("fail")))
 
+        return list(self.iterPR(user, repo, state, base, since))
 
-    def getPR(self, user, repo, state, base):
-        """Get PRs for given repo
+    def iterPR(self, user, repo, state, base, since=None):
+        """Iterate PRs for given repo page by page
         
         :param user: Repo's owner
         :type user: string
@@ -436,7 +1217,11 @@ class GitHub:
         :type state: string
         :param base: Filter by base name
         :type base: string or none
+        :param since: Only PRs updated since ISO 8601 time, all if none
+        :type since: string or none
         :raises Exception: PRs get failed
+        :return: PRs
+        :rtype: iterator of prs
         """
 
         reqParams = {'per_page': 100}
@@ -446,119 +1231,306 @@ class GitHub:
         if base is not None:
             reqParams['base'] = base
 
+        if since is not None:
+            reqParams['sort'] = 'updated'
+            reqParams['direction'] = 'desc'
+
         url = self.BASE_URL + F"repos/{user}/{repo}/pulls"
-        PRs = []
 
         while True:
-            response = self.session.get(url, params=reqParams)
+            response = self.request('GET', url, params=reqParams)
             reqParams = {}
 
-            if not response.ok:
+            if response.status != 200:
                 raise Exception("PR get failed")
 
-            PRs.extend(response.json())
+            for pr in pullRequests(response.data):
+                if since is not None and pr.updatedAt < since:
+                    return
+                yield pr
 
             if 'next' not in response.links:
-                return PRs
+                return
 
-            url = response.links["next"]["url"]
+            if self.pageExecutor is not None and since is None and 'last' in response.links:
+                for page in self.iterPages(getPagesAddress(
+                        response.links['next'], response.links['last'])):
+                    yield from pullRequests(page)
+                return
 
-    def processPR(self, pr, labels, delete):
-        """Set correct labels for PR
+            url = response.links["next"]
+
+    def iterRepos(self, owner, org, pattern=None, topics=(), archived=False):
+        """Iterate repositories of organization or user page by page
         
-        :param pr: PR
-        :type pr: PR object
-        :param labels: Labels
-        :type labels: dict
-        :param delete: Delete if additional label exist
-        :type delete: bool
+        :param owner: Organization or user name
+        :type owner: string
+        :param org: Owner is organization
+        :type org: bool
+        :param pattern: Name glob, matched with owner if it contains slash
+        :type pattern: string or none
+        :param topics: Repository has at least one of topics, any if empty
+        :type topics: tuple
+        :param archived: Include archived repositories
+        :type archived: bool
+        :raises Exception: Repos get failed
+        :return: user repo pairs
+        :rtype: iterator of tuples
         """
-        try:
-            files = self.getPRFiles(pr)
-            calculatedLabels = set()
-            for file in files:
-                for label in getLabels(labels, file["filename"]):
-                    calculatedLabels.add(label)
-
-            prLabels = {label['name'] for label in pr['labels']}
-            labelsAvailable = set(labels.keys())
-            labelsAdd = calculatedLabels - prLabels
-            labelsToRemove = (prLabels & labelsAvailable) - calculatedLabels
-            labelsKnown = ((prLabels & labelsAvailable) -
-                           labelsAdd) - labelsToRemove
-
-            labelsFinal = set(prLabels | labelsAdd)
-
-            if delete:
-                labelsFinal = labelsFinal - labelsToRemove
 
-            self.updateLabels(pr, labelsFinal)
+        url, reqParams = getReposAddress(self.BASE_URL, owner, org, self.username)
+        while True:
+            response = self.request('GET', url, params=reqParams)
+            reqParams = {}
+            if response.status != 200:
+                raise Exception("Repos get failed")
 
-            click.echo("  {} {} - {}".format(format("pr"),
-                                             pr['html_url'], format("ok")))
+            for repo in response.data:
+                if matchRepo(repo, pattern, topics, archived):
+                    yield repo['owner']['login'], repo['name']
 
-            labels = []
+            if 'next' not in response.links:
+                return
 
-            if delete:
-                for label in labelsToRemove:
-                    labels.append([label, '-', 'red'])
+            url = response.links["next"]
 
-            for label in labelsAdd:
-                labels.append([label, '+', 'green'])
+    def processPR(self, pr, labels, delete, slot=None):
+        """Set correct labels for PR
+        
+        :param pr: PR
+        :type pr: PullRequest
+        :param labels: Labels
+        :type labels: LabelMatcher
+        :param delete: Delete if additional label exist
+        :type delete: bool
+        :param slot: Output slot, new one is reserved if none
+        :type slot: Slot or none
+        :return: PR was labeled
+        :rtype: bool
+        """
+        if slot is None:
+            slot = self.output.slot()
+        with self.lock:
+            self.processed += 1
+        with tally() as current:
+            try:
+                labels = compileLabels(labels)
+                calculatedLabels, truncated = self.calculateLabels(pr, labels)
+
+                with self.profiler.cpu('plan writes'):
+                    prLabels = set(pr.labels)
+                    plan = LabelPlan(prLabels, calculatedLabels, labels.names,
+                                     delete and not truncated)
+
+                self.applyPlan(pr, plan)
+                self.countPR(plan)
+                if self.journal is not None and not self.dryRun:
+                    self.journal.record(pr, labels.digest)
+
+                with self.profiler.cpu('format output'):
+                    writePR(slot, self.INDENT, pr, plan, self.dryRun, truncated, current)
+            except:
+                self.metrics.inc('filabel_prs_processed_total', (('status', 'fail'),))
+                with self.lock:
+                    self.failed += 1
+                writePR(slot, self.INDENT, pr, current=current)
+                return False
+            finally:
+                slot.close()
+            return True
 
-            for label in labelsKnown:
-                labels.append([label, '='])
+    
+    def countPR(self, plan):
+        """Record processed PR and its label changes
+        
+        :param plan: Label writes
+        :type plan: LabelPlan
+        """
+        if not self.metrics.enabled:
+            return
+        self.metrics.inc('filabel_prs_processed_total', (('status', 'ok'),))
+        self.metrics.inc('filabel_labels_added_total', value=len(plan.add))
+        if plan.delete:
+            self.metrics.inc('filabel_labels_removed_total', value=len(plan.remove))
+
+    def calculateLabels(self, pr, labels):
+        """Get labels matching PR files, cached result skips files download
+        
+        Pages of files are matched as they are downloaded, paging stops
+        once all labels match.
 
-            labels.sort(key=lambda x: x[0])
+        :param pr: PR
+        :type pr: PullRequest
+        :param labels: Labels
+        :type labels: LabelMatcher
+        :return: Labels and whether files list was truncated
+        :rtype: tuple
+        """
+        key = None
+        if self.labelCache is not None:
+            key = self.labelCache.prKey(pr, labels.digest)
+            cached = self.labelCache.lookup(key)
+            if cached is not None:
+                return cached
+
+        calculatedLabels = set()
+        count = 0
+        complete = False
+        for page in self.iterPRFiles(pr):
+            count += len(page)
+            with self.profiler.cpu('compute labels'):
+                calculatedLabels |= labels.matchFiles(page)
+            if calculatedLabels >= labels.names:
+                complete = True
+                break
+        truncated = not complete and filesTruncated(pr, count)
 
-            for label in labels:
-                if label[1] == '=':
-                    click.echo("    {} {}".format(label[1], label[0]))
-                else:
-                    click.echo(click.style("    {} {}".format(
-                        label[1], label[0]), fg=label[2]))
+        if self.labelCache is not None:
+            self.labelCache.store(key, calculatedLabels, truncated)
+        return calculatedLabels, truncated
 
-        except:
-            click.echo("  {} {} - {}".format(format("pr"),
-                                             pr['html_url'], format("fail")))
+    def applyPlan(self, pr, plan):
+        """Send planned label writes, nothing is sent in dry run
+        
+        :param pr: PR
+        :type pr: PullRequest
+        :param plan: Label writes
+        :type plan: LabelPlan
+        """
+        with self.lock:
+            self.writesSaved += plan.saved
+        if self.dryRun:
+            return
+
+        for method, labels in plan.mutations:
+            if method == 'PUT':
+                self.updateLabels(pr, labels)
+            elif method == 'POST':
+                self.addLabels(pr, labels)
+            else:
+                self.removeLabel(pr, labels[0])
+            with self.lock:
+                self.writesSent += 1
 
-    
     def updateLabels(self, pr, labels):
         """Set labels for PR
         
         :param pr: PR
-        :type pr: PR object
+        :type pr: PullRequest
         :param labels: labels
         :type labels: list
         :raises Exception: Settings failed
         """
         data = list(labels)
-        url = F"{pr['issue_url']}/labels"
-        response = self.session.put(url, json=data)
-        if not response.ok:
+        url = F"{pr.issueUrl}/labels"
+        response = self.request('PUT', url, json=data)
+        if response.status != 200:
             raise Exception("Update labels failed")
 
+    def addLabels(self, pr, labels):
+        """Add labels to PR
+        
+        :param pr: PR
+        :type pr: PullRequest
+        :param labels: labels
+        :type labels: list
+        :raises Exception: Settings failed
+        """
+        url = F"{pr.issueUrl}/labels"
+        response = self.request('POST', url, json=list(labels))
+        if response.status != 200:
+            raise Exception("Add labels failed")
+
+    def removeLabel(self, pr, label):
+        """Remove label from PR
+        
+        :param pr: PR
+        :type pr: PullRequest
+        :param label: label
+        :type label: string
+        :raises Exception: Settings failed
+        """
+        url = F"{pr.issueUrl}/labels/{parse.quote(label, safe='')}"
+        response = self.request('DELETE', url)
+        # Label already removed by hand or by concurrent job
+        if response.status not in (200, 404):
+            raise Exception("Remove label failed")
+
     def getPRFiles(self, pr):
-        """Async Get All Files for PR
+        """Get All Files for PR
         
         :param pr: PR
-        :type pr: PR object
+        :type pr: PullRequest
         :raises Exception: Get Failed
-        :return: Files objects
+        :return: File paths
         :rtype: list
         """
-        url = F"{pr['url']}/files"
-        files = []
+        return [file for page in self.iterPRFiles(pr) for file in page]
+
+    def iterPRFiles(self, pr):
+        """Iterate pages of PR files
+        
+        :param pr: PR
+        :type pr: PullRequest
+        :raises Exception: Get Failed
+        :return: pages of file paths
+        :rtype: iterator of lists
+        """
+        url = F"{pr.url}/files"
         reqParams = {'per_page': 100}
         while True:
-            response = self.session.get(url, params=reqParams)
+            response = self.request('GET', url, params=reqParams)
             reqParams = {}
-            if not response.ok:
+            if response.status != 200:
                 raise Exception("File get failed")
 
-            files.extend(response.json())
+            yield filePaths(response.data)
 
             if 'next' not in response.links:
-                return files
+                return
+
+            if self.pageExecutor is not None and 'last' in response.links:
+                for page in self.iterPages(getPagesAddress(
+                        response.links['next'], response.links['last'])):
+                    yield filePaths(page)
+                return
+
+            url = response.links["next"]
+
+    def iterPages(self, addresses):
+        """Iterate pages downloaded by threads in order, few following pages are downloaded in advance
+        
+        :param addresses: Addresses of pages
+        :type addresses: list
+        :raises Exception: Get failed
+        :return: pages
+        :rtype: iterator of lists
+        """
 
-            url = response.links["next"]["url"]
\ No newline at end of file
+        addresses = iter(addresses)
+        context = contextvars.copy_context()
+        futures = deque(self.pageExecutor.submit(context.copy().run, self.getJson, address)
+                        for address in itertools.islice(addresses, self.PAGE_PREFETCH))
+        try:
+            while futures:
+                page = futures.popleft().result()
+                for address in itertools.islice(addresses, 1):
+                    futures.append(self.pageExecutor.submit(context.copy().run, self.getJson, address))
+                yield page
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def getJson(self, address):
+        """Download and parse JSON
+        
+        :param address: Address of endpoint
+        :type address: string
+        :raises Exception: Get failed
+        :return: downloaded object
+        :rtype: dict
+        """
+        response = self.request('GET', address)
+        if response.status != 200:
+            raise Exception("Get failed")
+        return response.data
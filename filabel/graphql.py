@@ -0,0 +1,197 @@
+from .github import GitHubAsync
+from .records import PullRequest
+
+
+PR_QUERY = """
+query($owner: String!, $name: String!, $states: [PullRequestState!], $base: String,
+      $after: String, $first: Int!, $files: Int!, $order: IssueOrderField!) {
+  repository(owner: $owner, name: $name) {
+    pullRequests(first: $first, after: $after, states: $states, baseRefName: $base,
+                 orderBy: {field: $order, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        number
+        url
+        headRefOid
+        baseRefOid
+        updatedAt
+        labels(first: 100) { pageInfo { hasNextPage } nodes { name } }
+        files(first: $files) { pageInfo { hasNextPage } nodes { path } }
+      }
+    }
+  }
+}
+"""
+"""
+PRs with labels and files query
+"""
+
+STATES = {
+    'open': ['OPEN'],
+    'closed': ['CLOSED', 'MERGED'],
+    'all': None,
+    None: ['OPEN'],
+}
+"""
+REST state filter to GraphQL PR states
+"""
+
+
+class GitHubGraphQL(GitHubAsync):
+    """
+    GitHub object for async PRs labeling with batched GraphQL queries
+
+    PRs are listed together with their labels and files, so most PRs need
+    no further request before labeling. Files of PRs with more files than
+    one nested page are downloaded by REST, labels are always written by
+    REST.
+    """
+
+    PR_PAGE = 50
+    """
+    Number of PRs in one query
+    """
+
+    FILES_PAGE = 100
+    """
+    Number of files of one PR in one query
+    """
+
+    def __init__(self, *args, **kwargs):
+        """GH constructor, arguments are same as GitHubAsync ones
+        """
+
+        GitHubAsync.__init__(self, *args, **kwargs)
+        self.prefetched = {}
+
+    async def query(self, query, variables):
+        """Async Run GraphQL query
+
+        :param query: GraphQL query
+        :type query: string
+        :param variables: Query variables
+        :type variables: dict
+        :raises Exception: Query failed
+        :return: Query data
+        :rtype: dict
+        """
+
+        response = await self.request('POST', self.BASE_URL + "graphql",
+                                      json={'query': query, 'variables': variables})
+        if response.status != 200 or not response.data or response.data.get('errors'):
+            raise Exception("GraphQL query failed")
+        return response.data['data']
+
+    def convertPR(self, user, repo, node):
+        """Convert GraphQL PR node to PR record
+
+        :param user: Repo's owner
+        :type user: string
+        :param repo: Repo name
+        :type repo: string
+        :param node: GraphQL PR node
+        :type node: dict
+        :return: PR
+        :rtype: PullRequest
+        """
+
+        number = node['number']
+        return PullRequest(number,
+                           self.BASE_URL + F"repos/{user}/{repo}/pulls/{number}",
+                           self.BASE_URL + F"repos/{user}/{repo}/issues/{number}",
+                           node['url'],
+                           [label['name'] for label in node['labels']['nodes']],
+                           F"{user}/{repo}", node['headRefOid'], node['baseRefOid'],
+                           node['updatedAt'])
+
+    async def iterPR(self, user, repo, state, base, since=None):
+        """Async Iterate PRs for given repo with their files page by page
+
+        :param user: Repo's owner
+        :type user: string
+        :param repo: Repo name
+        :type repo: string
+        :param state: Filter PR state (open|close|all)
+        :type state: string
+        :param base: Filter by base name
+        :type base: string or none
+        :param since: Only PRs updated since ISO 8601 time, all if none
+        :type since: string or none
+        :raises Exception: PRs get failed
+        :return: PRs
+        :rtype: async iterator of prs
+        """
+
+        variables = {'owner': user, 'name': repo, 'states': STATES[state],
+                     'base': base, 'after': None,
+                     'first': self.PR_PAGE, 'files': self.FILES_PAGE,
+                     'order': 'CREATED_AT' if since is None else 'UPDATED_AT'}
+        while True:
+            data = await self.query(PR_QUERY, variables)
+            if data['repository'] is None:
+                raise Exception("PR get failed")
+            pullRequests = data['repository']['pullRequests']
+
+            for node in pullRequests['nodes']:
+                if since is not None and node['updatedAt'] < since:
+                    return
+                pr = self.convertPR(user, repo, node)
+                if node['labels']['pageInfo']['hasNextPage']:
+                    pr = PullRequest.fromJson(await self.getJson(pr.url))
+                if not node['files']['pageInfo']['hasNextPage']:
+                    self.prefetched[pr.url] = [file['path'] for file in node['files']['nodes']]
+                yield pr
+
+            if not pullRequests['pageInfo']['hasNextPage']:
+                return
+            variables['after'] = pullRequests['pageInfo']['endCursor']
+
+    async def processPR(self, pr, labels, delete, slot=None):
+        """Async Set correct labels for PR, prefetched files are released after
+
+        :param pr: PR
+        :type pr: PullRequest
+        :param labels: Labels
+        :type labels: LabelMatcher
+        :param delete: Delete if additional label exist
+        :type delete: bool
+        :param slot: Output slot, new one is reserved if none
+        :type slot: Slot or none
+        :return: PR was labeled
+        :rtype: bool
+        """
+
+        try:
+            return await GitHubAsync.processPR(self, pr, labels, delete, slot)
+        finally:
+            self.releasePR(pr)
+
+    def releasePR(self, pr):
+        """Release prefetched files of PR which is not going to be processed
+
+        :param pr: PR
+        :type pr: PullRequest
+        """
+
+        self.prefetched.pop(pr.url, None)
+
+    async def iterPRFiles(self, pr):
+        """Async Iterate pages of PR files, REST is used if query did not get all of them
+
+        :param pr: PR
+        :type pr: PullRequest
+        :raises Exception: Get Failed
+        :return: pages of file paths
+        :rtype: async iterator of lists
+        """
+
+        files = self.prefetched.pop(pr.url, None)
+        if files is not None:
+            yield files
+            return
+        pages = GitHubAsync.iterPRFiles(self, pr)
+        try:
+            async for page in pages:
+                yield page
+        finally:
+            await pages.aclose()
@@ -0,0 +1,227 @@
+import sys
+import threading
+import traceback
+from collections import OrderedDict, deque
+
+
+class QueueFull(Exception):
+    """
+    Job queue reached its maximal depth
+    """
+
+
+class JobQueue:
+    """
+    Bounded job queue drained by pool of worker threads
+
+    Jobs are identified by key, job submitted while another one with the
+    same key is still queued replaces its payload, so a burst of events for
+    one PR is handled once with the latest payload. Jobs with the same key
+    never run concurrently. Repeated delivery IDs are dropped.
+    """
+
+    def __init__(self, handler, workers=4, maxDepth=1000, deliveries=10000):
+        """Queue constructor
+
+        :param handler: Function called with job payload
+        :type handler: callable
+        :param workers: Number of worker threads
+        :type workers: int
+        :param maxDepth: Maximal number of queued jobs
+        :type maxDepth: int
+        :param deliveries: Number of remembered delivery IDs
+        :type deliveries: int
+        """
+
+        self.handler = handler
+        self.workers = workers
+        self.maxDepth = maxDepth
+        self.deliveries = deliveries
+        self.condition = threading.Condition()
+        self.order = deque()
+        self.pending = {}
+        self.running = set()
+        self.seen = OrderedDict()
+        self.threads = []
+
+    def start(self):
+        """
+        Start worker threads
+        """
+        with self.condition:
+            if self.threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self.work, name=F'filabel-worker-{i}', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    @property
+    def depth(self):
+        """
+        Number of queued jobs
+        """
+        return len(self.pending)
+
+    def submit(self, key, payload, delivery=None):
+        """Enqueue job
+
+        :param key: Job key
+        :type key: hashable
+        :param payload: Job payload passed to handler
+        :type payload: object
+        :param delivery: Delivery ID
+        :type delivery: string or none
+        :raises QueueFull: Queue is full
+        :return: queued, coalesced or duplicate
+        :rtype: string
+        """
+
+        with self.condition:
+            if delivery is not None:
+                if delivery in self.seen:
+                    return 'duplicate'
+                self.seen[delivery] = True
+                if len(self.seen) > self.deliveries:
+                    self.seen.popitem(last=False)
+
+            if key in self.pending:
+                self.pending[key] = payload
+                return 'coalesced'
+
+            if len(self.pending) >= self.maxDepth:
+                if delivery is not None:
+                    del self.seen[delivery]
+                raise QueueFull('Job queue is full')
+
+            self.pending[key] = payload
+            if key not in self.running:
+                self.order.append(key)
+                self.condition.notify_all()
+            return 'queued'
+
+    def work(self):
+        """
+        Worker thread loop
+        """
+        while True:
+            with self.condition:
+                while not self.order:
+                    self.condition.wait()
+                key = self.order.popleft()
+                payload = self.pending.pop(key)
+                self.running.add(key)
+
+            try:
+                self.handler(payload)
+            except Exception:
+                traceback.print_exc(file=sys.stderr)
+
+            with self.condition:
+                self.running.discard(key)
+                if key in self.pending:
+                    self.order.append(key)
+                self.condition.notify_all()
+
+    def join(self):
+        """
+        Wait until all queued jobs are done
+        """
+        with self.condition:
+            while self.order or self.running or self.pending:
+                self.condition.wait()
+
+
+class AsyncJobQueue(JobQueue):
+    """
+    Job queue drained by asyncio tasks
+
+    Keeps semantics of JobQueue (coalescing, one job per key at a time,
+    dropped repeated deliveries), handler is coroutine function. Queue is
+    used from event loop thread only, so workers are cheap tasks instead of
+    threads and hundreds of jobs can wait for GitHub API at once.
+    """
+
+    def __init__(self, handler, workers=100, maxDepth=1000, deliveries=10000):
+        """Queue constructor
+
+        :param handler: Coroutine function called with job payload
+        :type handler: callable
+        :param workers: Number of worker tasks
+        :type workers: int
+        :param maxDepth: Maximal number of queued jobs
+        :type maxDepth: int
+        :param deliveries: Number of remembered delivery IDs
+        :type deliveries: int
+        """
+
+        super().__init__(handler, workers, maxDepth, deliveries)
+        self.ready = None
+        self.tasks = []
+
+    def start(self):
+        """
+        Start worker tasks, called in running event loop
+        """
+        import asyncio
+
+        if self.tasks:
+            return
+        self.ready = asyncio.Semaphore(len(self.order))
+        self.tasks = [asyncio.ensure_future(self.work()) for i in range(self.workers)]
+
+    def submit(self, key, payload, delivery=None):
+        """Enqueue job
+
+        :param key: Job key
+        :type key: hashable
+        :param payload: Job payload passed to handler
+        :type payload: object
+        :param delivery: Delivery ID
+        :type delivery: string or none
+        :raises QueueFull: Queue is full
+        :return: queued, coalesced or duplicate
+        :rtype: string
+        """
+
+        before = len(self.order)
+        status = super().submit(key, payload, delivery)
+        if len(self.order) > before and self.ready is not None:
+            self.ready.release()
+        return status
+
+    async def work(self):
+        """
+        Worker task loop
+        """
+        import asyncio
+
+        while True:
+            await self.ready.acquire()
+            key = self.order.popleft()
+            payload = self.pending.pop(key)
+            self.running.add(key)
+
+            try:
+                await self.handler(payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                traceback.print_exc(file=sys.stderr)
+
+            self.running.discard(key)
+            if key in self.pending:
+                self.order.append(key)
+                self.ready.release()
+
+    async def stop(self):
+        """
+        Cancel worker tasks, queued jobs are dropped
+        """
+        import asyncio
+
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+
+
+class Journal:
+    """
+    Append-only checkpoint of labeled PRs
+
+    Every line holds repo, PR number, head commit and labels configuration
+    digest of one completed PR, so resumed run skips PRs which did not change
+    since. Lines are buffered and appended with fsync once per syncInterval,
+    killed run loses at most the last interval and labels those PRs again.
+    Whole lines are written by single append, so worker processes can share
+    the file.
+    """
+
+    def __init__(self, path, syncInterval=1.0):
+        """Journal constructor
+
+        :param path: Journal file path, it is created if missing
+        :type path: string
+        :param syncInterval: Seconds between writes to disk
+        :type syncInterval: float
+        """
+
+        self.path = path
+        self.syncInterval = syncInterval
+        self.lock = threading.Lock()
+        self.completed = set()
+        self.buffer = []
+        self.synced = time.monotonic()
+        self.load()
+        self.fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    @staticmethod
+    def key(pr, digest):
+        """Create entry of PR
+
+        :param pr: PR
+        :type pr: PullRequest
+        :param digest: Labels configuration digest
+        :type digest: string
+        :return: journal line without newline
+        :rtype: string
+        """
+
+        return '\t'.join((pr.reposlug, str(pr.number), pr.headSha, digest))
+
+    def load(self):
+        """
+        Load completed entries, unfinished last line is ignored
+        """
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                for line in file:
+                    if line.endswith('\n'):
+                        self.completed.add(line[:-1])
+        except OSError:
+            pass
+
+    def done(self, pr, digest):
+        """Check PR was completed by previous run
+
+        :param pr: PR
+        :type pr: PullRequest
+        :param digest: Labels configuration digest
+        :type digest: string
+        :return: PR is completed
+        :rtype: bool
+        """
+
+        return self.key(pr, digest) in self.completed
+
+    def record(self, pr, digest):
+        """Record completed PR
+
+        :param pr: PR
+        :type pr: PullRequest
+        :param digest: Labels configuration digest
+        :type digest: string
+        """
+
+        with self.lock:
+            self.buffer.append(self.key(pr, digest) + '\n')
+            if time.monotonic() - self.synced >= self.syncInterval:
+                self.sync()
+
+    def sync(self):
+        """
+        Append buffered entries and fsync, caller holds the lock
+        """
+        if self.buffer:
+            os.write(self.fd, ''.join(self.buffer).encode('utf-8'))
+            os.fsync(self.fd)
+            self.buffer = []
+        self.synced = time.monotonic()
+
+    def close(self):
+        """
+        Write remaining entries and close file
+        """
+        with self.lock:
+            if self.fd is not None:
+                self.sync()
+                os.close(self.fd)
+                self.fd = None
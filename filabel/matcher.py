@@ -0,0 +1,92 @@
+import fnmatch
+import hashlib
+import json
+import os
+import re
+
+
+class LabelMatcher:
+    """
+    Compiled labels definition
+
+    Every label's patterns are merged into one regular expression, so a path
+    is tested once per label instead of once per pattern. Results are
+    memoized per path, so the same file in other PRs or repos is free.
+    """
+
+    CACHE_SIZE = 200000
+    """
+    Maximal number of memoized paths
+    """
+
+    def __init__(self, labels):
+        """Matcher constructor
+
+        :param labels: Labels definition
+        :type labels: dict
+        """
+
+        self.source = labels
+        self.names = frozenset(labels.keys())
+        self.digest = hashlib.sha1(json.dumps(
+            labels, sort_keys=True).encode('utf-8')).hexdigest()
+        self.cache = {}
+        self.compiled = []
+        for label, patterns in labels.items():
+            # Empty alternation would match every path
+            if not patterns:
+                continue
+            regex = '|'.join(fnmatch.translate(os.path.normcase(pattern))
+                             for pattern in patterns)
+            self.compiled.append((label, re.compile(regex).match))
+
+    def matchPath(self, path):
+        """Get all labels for given path
+
+        :param path: File full path
+        :type path: string
+        :return: Labels
+        :rtype: frozenset
+        """
+
+        try:
+            return self.cache[path]
+        except KeyError:
+            pass
+
+        normalized = os.path.normcase(path)
+        result = frozenset(label for label, match in self.compiled
+                           if match(normalized))
+
+        if len(self.cache) >= self.CACHE_SIZE:
+            self.cache.clear()
+        self.cache[path] = result
+        return result
+
+    def matchFiles(self, paths):
+        """Get all labels for given paths
+
+        :param paths: Files full paths
+        :type paths: iterable of string
+        :return: Labels
+        :rtype: set
+        """
+
+        result = set()
+        for path in paths:
+            result |= self.matchPath(path)
+        return result
+
+
+def compileLabels(labels):
+    """Compile labels definition, compiled matcher is returned as is
+
+    :param labels: Labels definition
+    :type labels: dict or LabelMatcher
+    :return: Compiled matcher
+    :rtype: LabelMatcher
+    """
+
+    if isinstance(labels, LabelMatcher):
+        return labels
+    return LabelMatcher(labels)
@@ -0,0 +1,249 @@
+import re
+import threading
+from collections import Counter
+
+
+ENDPOINTS = [
+    ('files', re.compile(r'/pulls/\d+/files')),
+    ('labels', re.compile(r'/issues/\d+/labels')),
+    ('pull', re.compile(r'/pulls/\d+$')),
+    ('pulls', re.compile(r'/pulls$')),
+    ('repos', re.compile(r'/(orgs/[^/]+|users/[^/]+|user)/repos$')),
+    ('graphql', re.compile(r'/graphql$')),
+    ('user', re.compile(r'/user$')),
+]
+"""
+Endpoint names by URL path pattern
+"""
+
+
+def endpointName(url):
+    """Get endpoint name of URL, keeps metric cardinality low
+
+    :param url: Request URL
+    :type url: string
+    :return: endpoint name
+    :rtype: string
+    """
+
+    path = str(url).split('?', 1)[0]
+    for name, pattern in ENDPOINTS:
+        if pattern.search(path):
+            return name
+    return 'other'
+
+
+class Metrics:
+    """
+    Counters, gauges and latency histograms of GitHub API usage
+    """
+
+    enabled = True
+
+    BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    """
+    Latency histogram buckets in seconds
+    """
+
+    def __init__(self):
+        """
+        Metrics constructor
+        """
+        self.lock = threading.Lock()
+        self.counters = Counter()
+        self.gauges = {}
+        self.histograms = {}
+
+    def inc(self, name, labels=(), value=1):
+        """Increase counter
+
+        :param name: Metric name
+        :type name: string
+        :param labels: Metric labels as (name, value) pairs
+        :type labels: tuple
+        :param value: Increment
+        :type value: int
+        """
+
+        with self.lock:
+            self.counters[(name, labels)] += value
+
+    def gauge(self, name, value, labels=()):
+        """Set gauge
+
+        :param name: Metric name
+        :type name: string
+        :param value: Value
+        :type value: float
+        :param labels: Metric labels as (name, value) pairs
+        :type labels: tuple
+        """
+
+        with self.lock:
+            self.gauges[(name, labels)] = value
+
+    def observe(self, name, value, labels=()):
+        """Add value to histogram
+
+        :param name: Metric name
+        :type name: string
+        :param value: Observed value
+        :type value: float
+        :param labels: Metric labels as (name, value) pairs
+        :type labels: tuple
+        """
+
+        with self.lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[(name, labels)] = [[0] * len(self.BUCKETS), 0, 0.0]
+            for i, bound in enumerate(self.BUCKETS):
+                if value <= bound:
+                    histogram[0][i] += 1
+            histogram[1] += 1
+            histogram[2] += value
+
+    def request(self, method, url, status, latency, headers):
+        """Record HTTP call
+
+        :param method: HTTP method
+        :type method: string
+        :param url: Request URL
+        :type url: string
+        :param status: HTTP status
+        :type status: int
+        :param latency: Latency in seconds
+        :type latency: float
+        :param headers: Response headers
+        :type headers: mapping
+        """
+
+        endpoint = endpointName(url)
+        self.inc('filabel_http_requests_total',
+                 (('method', method), ('endpoint', endpoint), ('status', str(status))))
+        self.observe('filabel_http_request_duration_seconds', latency,
+                     (('method', method), ('endpoint', endpoint)))
+        remaining = headers.get('X-RateLimit-Remaining')
+        if remaining is not None:
+            self.gauge('filabel_rate_limit_remaining', float(remaining))
+
+    def snapshot(self):
+        """Get copy of all values, can be sent to other process
+
+        :return: counters, gauges and histograms
+        :rtype: tuple
+        """
+
+        with self.lock:
+            return (dict(self.counters), dict(self.gauges),
+                    {key: [list(value[0]), value[1], value[2]]
+                     for key, value in self.histograms.items()})
+
+    def merge(self, snapshot):
+        """Add values of snapshot
+
+        :param snapshot: Snapshot of other metrics
+        :type snapshot: tuple
+        """
+
+        counters, gauges, histograms = snapshot
+        with self.lock:
+            self.counters.update(counters)
+            self.gauges.update(gauges)
+            for key, (buckets, count, total) in histograms.items():
+                histogram = self.histograms.setdefault(key, [[0] * len(self.BUCKETS), 0, 0.0])
+                histogram[0] = [a + b for a, b in zip(histogram[0], buckets)]
+                histogram[1] += count
+                histogram[2] += total
+
+    def render(self):
+        """Render metrics in Prometheus text format
+
+        :return: exposition text
+        :rtype: string
+        """
+
+        def formatLabels(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join('{}="{}"'.format(key, str(value).replace('"', '\\"'))
+                                  for key, value in pairs) + '}'
+
+        counters, gauges, histograms = self.snapshot()
+        lines = []
+        typed = set()
+        for kind, values in (('counter', counters), ('gauge', gauges)):
+            for (name, labels), value in sorted(values.items()):
+                if name not in typed:
+                    lines.append(F'# TYPE {name} {kind}')
+                    typed.add(name)
+                lines.append(F'{name}{formatLabels(labels)} {value}')
+        for (name, labels), (buckets, count, total) in sorted(histograms.items()):
+            if name not in typed:
+                lines.append(F'# TYPE {name} histogram')
+                typed.add(name)
+            for bound, value in zip(self.BUCKETS, buckets):
+                lines.append('{}_bucket{} {}'.format(
+                    name, formatLabels(labels, [('le', bound)]), value))
+            lines.append('{}_bucket{} {}'.format(name, formatLabels(labels, [('le', '+Inf')]), count))
+            lines.append(F'{name}_sum{formatLabels(labels)} {total}')
+            lines.append(F'{name}_count{formatLabels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """Render human readable summary table
+
+        :return: table
+        :rtype: string
+        """
+
+        counters, gauges, histograms = self.snapshot()
+        lines = ['{:<8} {:<10} {:>6} {:>8}'.format('METHOD', 'ENDPOINT', 'STATUS', 'COUNT')]
+        for (name, labels), value in sorted(counters.items()):
+            if name == 'filabel_http_requests_total':
+                labels = dict(labels)
+                lines.append('{:<8} {:<10} {:>6} {:>8}'.format(
+                    labels['method'], labels['endpoint'], labels['status'], value))
+
+        lines.append('')
+        lines.append('{:<8} {:<10} {:>8} {:>10}'.format('METHOD', 'ENDPOINT', 'CALLS', 'AVG MS'))
+        for (name, labels), (buckets, count, total) in sorted(histograms.items()):
+            labels = dict(labels)
+            lines.append('{:<8} {:<10} {:>8} {:>10.1f}'.format(
+                labels['method'], labels['endpoint'], count, 1000 * total / count if count else 0))
+
+        lines.append('')
+        for (name, labels), value in sorted(counters.items()):
+            if name != 'filabel_http_requests_total':
+                suffix = ' '.join(F'{key}={value}' for key, value in labels)
+                lines.append('{:<40} {:>8}'.format((name + ' ' + suffix).strip(), value))
+        for (name, labels), value in sorted(gauges.items()):
+            lines.append('{:<40} {:>8}'.format(name, value))
+        return '\n'.join(lines)
+
+
+class NullMetrics:
+    """
+    Disabled metrics, every call does nothing
+    """
+
+    enabled = False
+
+    def inc(self, name, labels=(), value=1):
+        pass
+
+    def gauge(self, name, value, labels=()):
+        pass
+
+    def observe(self, name, value, labels=()):
+        pass
+
+    def request(self, method, url, status, latency, headers):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+"""
+Shared disabled metrics
+"""
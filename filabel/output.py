@@ -0,0 +1,276 @@
+import contextlib
+import contextvars
+import sys
+import threading
+import time
+from collections import deque
+
+import click
+
+try:
+    from orjson import dumps as dumpJson
+except ImportError:
+    import json
+
+    def dumpJson(obj):
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+class Slot:
+    """
+    Reserved place in output
+
+    Slots form a tree - repo slot holds slots of its PRs. In ordered mode
+    text of a slot is written once all preceding slots are written, so
+    results can be finished in any order and still appear in submission
+    order. In unordered mode text is written immediately.
+    """
+
+    def __init__(self, output):
+        """Slot constructor
+
+        :param output: Owning output
+        :type output: Output
+        """
+
+        self.output = output
+        self.items = deque()
+        self.closed = False
+
+    def write(self, text):
+        """Write text to slot
+
+        :param text: Text, encoded lines in NDJSON output
+        :type text: string or bytes
+        """
+
+        with self.output.lock:
+            if self.output.ordered:
+                self.items.append(text)
+                self.output.drain()
+            else:
+                self.output.emit(text)
+
+    def slot(self):
+        """Reserve child slot after already written text
+
+        :return: child slot
+        :rtype: Slot
+        """
+
+        child = Slot(self.output)
+        if self.output.ordered:
+            with self.output.lock:
+                self.items.append(child)
+        return child
+
+    def close(self):
+        """
+        Mark slot as complete, nothing can be written after
+        """
+        with self.output.lock:
+            self.closed = True
+            self.output.drain()
+
+    def drain(self):
+        """Emit text which is not blocked by unfinished slot, caller holds the lock
+
+        :return: Slot is complete and fully emitted
+        :rtype: bool
+        """
+
+        while self.items:
+            item = self.items[0]
+            if isinstance(item, Slot):
+                if not item.drain():
+                    return False
+            else:
+                self.output.emit(item)
+            self.items.popleft()
+        return self.closed
+
+
+class Output:
+    """
+    Buffered output of labeling results
+
+    Text is written to stream in blocks of bufferSize, or immediately when
+    stream is terminal. Styles are removed by click when stream is not
+    terminal.
+    """
+
+    ndjson = False
+    """
+    Results are written as JSON records
+    """
+
+    def __init__(self, stream=None, ordered=True, bufferSize=64 * 1024, color=None):
+        """Output constructor
+
+        :param stream: Output stream, stdout by default
+        :type stream: file or none
+        :param ordered: Keep submission order of slots
+        :type ordered: bool
+        :param bufferSize: Size of buffered text in characters
+        :type bufferSize: int
+        :param color: Keep styles, by default only for terminal
+        :type color: bool or none
+        """
+
+        self.stream = stream if stream is not None else sys.stdout
+        self.ordered = ordered
+        self.bufferSize = bufferSize
+        self.color = color
+        self.interactive = self.stream.isatty()
+        self.lock = threading.RLock()
+        self.buffer = []
+        self.buffered = 0
+        self.root = Slot(self)
+
+    def slot(self):
+        """Reserve top level slot
+
+        :return: slot
+        :rtype: Slot
+        """
+
+        return self.root.slot()
+
+    def emit(self, text):
+        """Buffer text, caller holds the lock
+
+        :param text: Text
+        :type text: string
+        """
+
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.interactive or self.buffered >= self.bufferSize:
+            self.flush()
+
+    def drain(self):
+        """
+        Emit all text not blocked by unfinished slot, caller holds the lock
+        """
+        if self.root.drain() or not self.root.items:
+            self.flush()
+
+    def flush(self):
+        """
+        Write buffered text to stream
+        """
+        with self.lock:
+            if self.buffer:
+                click.echo(''.join(self.buffer), file=self.stream, nl=False, color=self.color)
+                self.buffer = []
+                self.buffered = 0
+
+    def close(self):
+        """
+        Write all remaining text
+        """
+        self.root.close()
+        self.flush()
+
+
+TALLIES = contextvars.ContextVar('filabel_tallies', default=())
+"""
+Tallies of repo and PR being processed, innermost last
+"""
+
+
+class Tally:
+    """
+    Number of requests and time spent on repo or PR
+    """
+
+    __slots__ = ('requests', 'start')
+
+    def __init__(self):
+        """
+        Tally constructor, time is counted since now
+        """
+        self.requests = 0
+        self.start = time.monotonic()
+
+    def summary(self):
+        """Get values for output record
+
+        :return: seconds and requests
+        :rtype: dict
+        """
+
+        return {'seconds': round(time.monotonic() - self.start, 6), 'requests': self.requests}
+
+
+@contextlib.contextmanager
+def tally():
+    """Count requests made in block, they are counted also to enclosing tallies
+
+    :return: tally of block
+    :rtype: Tally
+    """
+
+    current = Tally()
+    token = TALLIES.set(TALLIES.get() + (current,))
+    try:
+        yield current
+    finally:
+        TALLIES.reset(token)
+
+
+def countRequest():
+    """
+    Count request to all tallies of current context, caller holds lock
+    shared by threads of context
+    """
+    for current in TALLIES.get():
+        current.requests += 1
+
+
+def encodeRecord(record):
+    """Encode record as NDJSON line
+
+    :param record: JSON serializable record
+    :type record: dict
+    :return: line
+    :rtype: bytes
+    """
+
+    return dumpJson(record) + b'\n'
+
+
+class NdjsonOutput(Output):
+    """
+    Buffered output of labeling results as JSON records, one per line
+
+    Slots hold encoded lines which are written to binary stream as they
+    are, without styling and text encoding of click.
+    """
+
+    ndjson = True
+
+    def __init__(self, stream=None, ordered=True, bufferSize=64 * 1024):
+        """Output constructor
+
+        :param stream: Binary output stream, stdout by default
+        :type stream: file or none
+        :param ordered: Keep submission order of slots
+        :type ordered: bool
+        :param bufferSize: Size of buffered lines in bytes
+        :type bufferSize: int
+        """
+
+        Output.__init__(self, stream if stream is not None else sys.stdout.buffer,
+                        ordered, bufferSize)
+
+    def flush(self):
+        """
+        Write buffered lines to stream
+        """
+        with self.lock:
+            if self.buffer:
+                self.stream.write(b''.join(self.buffer))
+                self.stream.flush()
+                self.buffer = []
+                self.buffered = 0
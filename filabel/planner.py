@@ -0,0 +1,78 @@
+class LabelPlan:
+    """
+    Minimal set of label writes for one PR
+
+    Unchanged PR needs no write. Adding labels is done by one POST and
+    removing a single label by one DELETE, both carry less data than PUT
+    of the whole label set. PUT is used when both would need more calls.
+    """
+
+    def __init__(self, prLabels, calculatedLabels, labelsAvailable, delete):
+        """Plan constructor
+
+        :param prLabels: Current PR labels
+        :type prLabels: set
+        :param calculatedLabels: Labels matching PR files
+        :type calculatedLabels: set
+        :param labelsAvailable: Configured labels
+        :type labelsAvailable: set
+        :param delete: Delete if additional label exist
+        :type delete: bool
+        """
+
+        self.delete = delete
+        self.add = calculatedLabels - prLabels
+        self.remove = (prLabels & labelsAvailable) - calculatedLabels
+        self.known = ((prLabels & labelsAvailable) - self.add) - self.remove
+        self.final = set(prLabels | self.add)
+        if delete:
+            self.final = self.final - self.remove
+
+        self.mutations = self.createMutations()
+
+    def createMutations(self):
+        """Create list of writes
+
+        :return: (method, labels) pairs, method is POST, DELETE or PUT
+        :rtype: list
+        """
+
+        mutations = []
+        if self.add:
+            mutations.append(('POST', sorted(self.add)))
+        if self.delete:
+            for label in sorted(self.remove):
+                mutations.append(('DELETE', [label]))
+
+        if len(mutations) > 1:
+            return [('PUT', sorted(self.final))]
+        return mutations
+
+    @property
+    def saved(self):
+        """
+        Number of writes saved against always writing the whole label set
+        """
+        return 1 - len(self.mutations)
+
+    def changes(self):
+        """Get sorted label changes for output
+
+        :return: (label, sign) pairs, sign is -, + or =
+        :rtype: list
+        """
+
+        labels = []
+
+        if self.delete:
+            for label in self.remove:
+                labels.append([label, '-'])
+
+        for label in self.add:
+            labels.append([label, '+'])
+
+        for label in self.known:
+            labels.append([label, '='])
+
+        labels.sort(key=lambda x: x[0])
+        return labels
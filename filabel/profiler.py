@@ -0,0 +1,203 @@
+import contextlib
+import contextvars
+import cProfile
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+
+from .metrics import endpointName
+
+
+REPO = contextvars.ContextVar('filabel_repo', default='-')
+"""
+Reposlug of currently processed repo, inherited by PR tasks
+"""
+
+REQUEST_PHASES = {
+    'repos': 'list repos',
+    'pulls': 'list PRs',
+    'pull': 'list PRs',
+    'graphql': 'list PRs',
+    'files': 'fetch files',
+    'labels': 'write labels',
+}
+"""
+Phase names of API endpoints
+"""
+
+
+class Profiler:
+    """
+    CPU and memory profile of labeling run
+
+    Whole run is profiled by cProfile and tracemalloc. Phases of every repo
+    are timed separately: time spent in GitHub API calls (including waiting
+    for a free connection) is counted as wait, synchronous work as parsing,
+    matching and formatting is counted as CPU time of the thread.
+    """
+
+    enabled = True
+
+    TOP = 20
+    """
+    Number of functions and allocation sites in summary
+    """
+
+    def __init__(self):
+        """
+        Profiler constructor
+        """
+        self.lock = threading.Lock()
+        self.spans = {}
+        self.profile = cProfile.Profile()
+        self.memory = None
+        self.peak = 0
+
+    def start(self):
+        """
+        Start cProfile and tracemalloc
+        """
+        tracemalloc.start()
+        self.profile.enable()
+
+    def stop(self):
+        """
+        Stop cProfile and tracemalloc, keep allocations snapshot
+        """
+        self.profile.disable()
+        self.memory = tracemalloc.take_snapshot()
+        self.peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def repo(self, reposlug):
+        """Attribute phases in block to repo
+
+        :param reposlug: Repo name with owner
+        :type reposlug: string
+        """
+
+        token = REPO.set(reposlug)
+        try:
+            yield
+        finally:
+            REPO.reset(token)
+
+    def record(self, phase, wait=0.0, cpu=0.0):
+        """Add timing to phase of current repo
+
+        :param phase: Phase name
+        :type phase: string
+        :param wait: Wait time in seconds
+        :type wait: float
+        :param cpu: CPU time in seconds
+        :type cpu: float
+        """
+
+        key = (REPO.get(), phase)
+        with self.lock:
+            span = self.spans.get(key)
+            if span is None:
+                span = self.spans[key] = [0, 0.0, 0.0]
+            span[0] += 1
+            span[1] += wait
+            span[2] += cpu
+
+    def request(self, url, seconds):
+        """Record time of API call
+
+        :param url: Request URL
+        :type url: string
+        :param seconds: Time from scheduling to downloaded body
+        :type seconds: float
+        """
+
+        self.record(REQUEST_PHASES.get(endpointName(url), 'other'), wait=seconds)
+
+    @contextlib.contextmanager
+    def cpu(self, phase):
+        """Record CPU time of synchronous block
+
+        :param phase: Phase name
+        :type phase: string
+        """
+
+        start = time.thread_time()
+        try:
+            yield
+        finally:
+            self.record(phase, cpu=time.thread_time() - start)
+
+    def phases(self):
+        """Format timing of phases per repo and in total
+
+        :return: table
+        :rtype: string
+        """
+
+        with self.lock:
+            spans = dict(self.spans)
+        totals = {}
+        for (repo, phase), (calls, wait, cpu) in spans.items():
+            total = totals.setdefault(('*', phase), [0, 0.0, 0.0])
+            total[0] += calls
+            total[1] += wait
+            total[2] += cpu
+
+        lines = ['{:<30} {:<15} {:>8} {:>10} {:>10}'.format(
+            'REPO', 'PHASE', 'CALLS', 'WAIT S', 'CPU S')]
+        for (repo, phase), (calls, wait, cpu) in sorted(spans.items()) + sorted(totals.items()):
+            lines.append('{:<30} {:<15} {:>8} {:>10.3f} {:>10.3f}'.format(
+                repo, phase, calls, wait, cpu))
+        return '\n'.join(lines)
+
+    def report(self, path):
+        """Save pstats file and format summary
+
+        :param path: pstats file path
+        :type path: string
+        :return: summary
+        :rtype: string
+        """
+
+        self.profile.dump_stats(path)
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=stream)
+        stats.sort_stats('cumulative').print_stats(self.TOP)
+
+        lines = [stream.getvalue().strip(), '',
+                 'Peak traced memory: {:.1f} MB'.format(self.peak / 2 ** 20)]
+        if self.memory is not None:
+            for stat in self.memory.statistics('lineno')[:self.TOP]:
+                lines.append(str(stat))
+        lines.append('')
+        lines.append(self.phases())
+        return '\n'.join(lines)
+
+
+class NullProfiler:
+    """
+    Disabled profiler, every call does nothing
+    """
+
+    enabled = False
+
+    def repo(self, reposlug):
+        return contextlib.nullcontext()
+
+    def record(self, phase, wait=0.0, cpu=0.0):
+        pass
+
+    def request(self, url, seconds):
+        pass
+
+    def cpu(self, phase):
+        return contextlib.nullcontext()
+
+
+NULL_PROFILER = NullProfiler()
+"""
+Shared disabled profiler
+"""
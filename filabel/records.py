@@ -0,0 +1,97 @@
+import sys
+
+
+class PullRequest:
+    """
+    Compact PR record
+
+    GitHub PR objects are several KB of nested dicts, labeling needs only
+    few fields of them. PRs are converted right after their page is decoded
+    and the object is dropped. Label names and repo names repeat across
+    PRs, they are interned so every PR shares the same strings.
+    """
+
+    __slots__ = ('number', 'url', 'issueUrl', 'htmlUrl', 'labels', 'reposlug',
+                 'headSha', 'baseSha', 'updatedAt', 'changedFiles')
+
+    def __init__(self, number, url, issueUrl, htmlUrl, labels=(), reposlug=None,
+                 headSha=None, baseSha=None, updatedAt=None, changedFiles=None):
+        """PR constructor
+
+        :param number: PR number
+        :type number: int
+        :param url: API address of PR
+        :type url: string
+        :param issueUrl: API address of PR issue
+        :type issueUrl: string
+        :param htmlUrl: Web address of PR
+        :type htmlUrl: string
+        :param labels: Current label names
+        :type labels: iterable
+        :param reposlug: Base repo name with owner, none if unknown
+        :type reposlug: string or none
+        :param headSha: Head commit, none if unknown
+        :type headSha: string or none
+        :param baseSha: Base commit, none if unknown
+        :type baseSha: string or none
+        :param updatedAt: Last update ISO 8601 time, none if unknown
+        :type updatedAt: string or none
+        :param changedFiles: Number of changed files, none if unknown
+        :type changedFiles: int or none
+        """
+
+        self.number = number
+        self.url = url
+        self.issueUrl = issueUrl
+        self.htmlUrl = htmlUrl
+        self.labels = tuple(sys.intern(label) for label in labels)
+        self.reposlug = sys.intern(reposlug) if reposlug is not None else None
+        self.headSha = headSha
+        self.baseSha = baseSha
+        self.updatedAt = updatedAt
+        self.changedFiles = changedFiles
+
+    @classmethod
+    def fromJson(cls, obj):
+        """Create record of REST PR object, e.g. API response or webhook payload
+
+        :param obj: Decoded PR object
+        :type obj: dict
+        :return: PR
+        :rtype: PullRequest
+        """
+
+        head = obj.get('head') or {}
+        base = obj.get('base') or {}
+        return cls(obj['number'], obj['url'], obj['issue_url'], obj['html_url'],
+                   [label['name'] for label in obj.get('labels') or ()],
+                   (base.get('repo') or {}).get('full_name'), head.get('sha'), base.get('sha'),
+                   obj.get('updated_at'), obj.get('changed_files'))
+
+    def __repr__(self):
+        return F'PullRequest({self.reposlug}#{self.number})'
+
+
+def pullRequests(page):
+    """Convert page of REST PR objects
+
+    :param page: Decoded PR objects
+    :type page: list
+    :return: PRs
+    :rtype: list of PullRequest
+    """
+
+    return [PullRequest.fromJson(obj) for obj in page]
+
+
+def filePaths(page):
+    """Convert page of REST file objects to paths, path string is the
+    most compact record of file as nothing else is needed for matching
+
+    :param page: Decoded file objects
+    :type page: list
+    :return: paths
+    :rtype: list of strings
+    """
+
+    return [file['filename'] for file in page]
@@ -0,0 +1,143 @@
+import asyncio
+import time
+
+
+class RateLimitScheduler:
+    """
+    Bounded concurrency scheduler for GitHub API requests
+
+    The number of in-flight requests is capped by a limit which follows
+    AIMD - it grows additively while responses are fast and healthy and is
+    cut multiplicatively on throttling, errors or slow responses. Rate limit
+    headers (``Retry-After``, ``X-RateLimit-Remaining``/``Reset``) pause all
+    requests until GitHub allows them again.
+    """
+
+    def __init__(self, maxConcurrency=32, minConcurrency=1, latencyTarget=2.0,
+                 decrease=0.5, cooldown=1.0):
+        """Scheduler constructor
+
+        :param maxConcurrency: Maximal number of in-flight requests
+        :type maxConcurrency: int
+        :param minConcurrency: Minimal number of in-flight requests
+        :type minConcurrency: int
+        :param latencyTarget: Latency in seconds above which concurrency is decreased
+        :type latencyTarget: float
+        :param decrease: Multiplicative decrease factor
+        :type decrease: float
+        :param cooldown: Minimal number of seconds between two decreases
+        :type cooldown: float
+        """
+
+        self.maxConcurrency = max(1, maxConcurrency)
+        self.minConcurrency = max(1, min(minConcurrency, self.maxConcurrency))
+        self.latencyTarget = latencyTarget
+        self.decreaseFactor = decrease
+        self.cooldown = cooldown
+        self.limit = float(max(self.minConcurrency, self.maxConcurrency // 4))
+        self.active = 0
+        self.pausedUntil = 0.0
+        self.lastDecrease = 0.0
+        self.condition = None
+
+    def getCondition(self):
+        """
+        Get condition bound to the running event loop, it is created on first use
+        """
+        if self.condition is None:
+            self.condition = asyncio.Condition()
+        return self.condition
+
+    async def acquire(self):
+        """
+        Wait for free request slot and respect rate limit pause
+        """
+        condition = self.getCondition()
+        while True:
+            delay = self.pausedUntil - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            async with condition:
+                if self.active < int(self.limit):
+                    self.active += 1
+                    return
+                await condition.wait()
+
+    async def release(self):
+        """
+        Return request slot
+        """
+        condition = self.getCondition()
+        async with condition:
+            self.active -= 1
+            condition.notify_all()
+
+    def increase(self):
+        """
+        Additive increase - one more slot per window of limit requests
+        """
+        self.limit = min(float(self.maxConcurrency), self.limit + 1 / self.limit)
+
+    def decrease(self):
+        """
+        Multiplicative decrease, at most once per cooldown
+        """
+        now = time.monotonic()
+        if now - self.lastDecrease < self.cooldown:
+            return
+        self.lastDecrease = now
+        self.limit = max(float(self.minConcurrency),
+                         self.limit * self.decreaseFactor)
+
+    def pause(self, seconds):
+        """Pause all requests for given time
+
+        :param seconds: Pause length
+        :type seconds: float
+        """
+
+        self.pausedUntil = max(self.pausedUntil, time.monotonic() + seconds)
+
+    def onResponse(self, status, headers, latency):
+        """Update limits from response
+
+        :param status: HTTP status
+        :type status: int
+        :param headers: Response headers
+        :type headers: mapping
+        :param latency: Request latency in seconds
+        :type latency: float
+        :return: Request was throttled and should be retried
+        :rtype: bool
+        """
+
+        throttled = False
+        retryAfter = headers.get('Retry-After')
+        if retryAfter is not None:
+            try:
+                self.pause(float(retryAfter))
+            except ValueError:
+                self.pause(60)
+            throttled = status in (403, 429)
+
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        if remaining is not None and reset is not None and int(remaining) == 0:
+            self.pause(max(0.0, float(reset) - time.time()) + 1)
+            throttled = throttled or status in (403, 429)
+
+        if status == 429:
+            throttled = True
+
+        if throttled or status >= 500 or latency > self.latencyTarget:
+            self.decrease()
+        else:
+            self.increase()
+        return throttled
+
+    def onError(self):
+        """
+        Update limits after connection error
+        """
+        self.decrease()
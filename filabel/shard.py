@@ -0,0 +1,213 @@
+import asyncio
+import io
+import json
+import multiprocessing.util
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import click
+
+from .matcher import LabelMatcher
+from .output import Output, NdjsonOutput
+from .metrics import Metrics, NULL_METRICS
+
+
+worker = {}
+"""
+Client and settings of current worker process
+"""
+
+
+def initWorker(settings, labels, color):
+    """Create client of worker process
+
+    :param settings: Client settings
+    :type settings: dict
+    :param labels: Labels definition
+    :type labels: dict
+    :param color: Keep styles in captured output
+    :type color: bool
+    """
+
+    from .cli import createClient
+
+    worker['settings'] = settings
+    worker['labels'] = LabelMatcher(labels)
+    worker['color'] = color
+    worker['github'] = createClient(settings, None)
+    if worker['github'].journal is not None:
+        multiprocessing.util.Finalize(None, worker['github'].journal.close, exitpriority=5)
+
+    if settings['mode'] != 'sync':
+        worker['loop'] = asyncio.new_event_loop()
+        asyncio.set_event_loop(worker['loop'])
+
+        def close():
+            worker['loop'].run_until_complete(worker['github'].close())
+            worker['loop'].close()
+
+        multiprocessing.util.Finalize(None, close, exitpriority=10)
+
+
+def runRepo(index, user, repo, state, base, delete, since):
+    """Label repo in worker process
+
+    :param index: Repo position in input
+    :type index: int
+    :param user: Repo's owner
+    :type user: string
+    :param repo: Repo name
+    :type repo: string
+    :param state: Filter PR state (open|close|all)
+    :type state: string
+    :param base: Filter by base name
+    :type base: string or none
+    :param delete: Delete if additional label exist
+    :type delete: bool
+    :param since: Only PRs updated since ISO 8601 time, all if none
+    :type since: string or none
+    :return: index, text output (NDJSON bytes), success, PRs count, skipped PRs count, failed PRs count,
+        writes sent and saved, metrics snapshot, new watermark
+    :rtype: tuple
+    """
+
+    github = worker['github']
+    if worker['settings']['output'] == 'ndjson':
+        stream = io.BytesIO()
+        github.output = NdjsonOutput(stream)
+    else:
+        stream = io.StringIO()
+        github.output = Output(stream, color=worker['color'])
+    github.metrics = Metrics() if worker['settings']['stats'] else NULL_METRICS
+    processed, skipped, failed = github.processed, github.skipped, github.failed
+    sent, saved = github.writesSent, github.writesSaved
+
+    if worker['settings']['mode'] == 'sync':
+        ok = github.processRepo(user, repo, state, base, worker['labels'], delete, since=since)
+    else:
+        ok = worker['loop'].run_until_complete(
+            github.processRepo(user, repo, state, base, worker['labels'], delete, since=since))
+
+    github.output.close()
+    return (index, stream.getvalue(), ok, github.processed - processed,
+            github.skipped - skipped, github.failed - failed,
+            github.writesSent - sent, github.writesSaved - saved,
+            github.metrics.snapshot() if github.metrics.enabled else None,
+            github.watermarks.pop(F"{user}/{repo}", None))
+
+
+def loadState(path):
+    """Load state of repos saved by previous run, e.g. known PR counts
+
+    :param path: State file path
+    :type path: string or none
+    :return: state by reposlug
+    :rtype: dict
+    """
+
+    if path is None:
+        return {}
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def saveState(path, state):
+    """Save state of repos for next run
+
+    :param path: State file path
+    :type path: string or none
+    :param state: state by reposlug
+    :type state: dict
+    """
+
+    if path is None:
+        return
+    tmp = F'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp, 'w', encoding='utf-8') as file:
+            json.dump(state, file)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def runSharded(reposlugs, settings, labels, state, base, delete, jobs, ordered, sinces):
+    """Label repos in worker processes and print their output
+
+    Repos with most PRs known from previous runs are dispatched first
+    (unknown ones before all), so big repos do not end up last on a
+    single worker.
+
+    :param reposlugs: user repo pairs
+    :type reposlugs: list
+    :param settings: Client settings
+    :type settings: dict
+    :param labels: Labels definition
+    :type labels: dict
+    :param state: Filter PR state (open|close|all)
+    :type state: string
+    :param base: Filter by base name
+    :type base: string or none
+    :param delete: Delete if additional label exist
+    :type delete: bool
+    :param jobs: Number of worker processes
+    :type jobs: int
+    :param ordered: Print repos in input order
+    :type ordered: bool
+    :param sinces: Lower bound of PR update time of every repo
+    :type sinces: list
+    :return: All repos and PRs succeeded, new watermarks by reposlug
+    :rtype: tuple
+    """
+
+    countsPath = None
+    if settings['cacheDir'] is not None:
+        os.makedirs(settings['cacheDir'], exist_ok=True)
+        countsPath = os.path.join(settings['cacheDir'], 'prcounts.json')
+    counts = loadState(countsPath)
+
+    order = sorted(range(len(reposlugs)),
+                   key=lambda i: -counts.get('/'.join(reposlugs[i]), float('inf')))
+
+    color = sys.stdout.isatty()
+    metrics = Metrics() if settings['stats'] else None
+    failed = failedPRs = processed = skipped = sent = saved = 0
+    watermarks = {}
+    with ProcessPoolExecutor(jobs, initializer=initWorker,
+                             initargs=(settings, labels, color)) as executor:
+        futures = [None] * len(reposlugs)
+        for i in order:
+            user, repo = reposlugs[i]
+            futures[i] = executor.submit(runRepo, i, user, repo, state, base, delete, sinces[i])
+
+        for future in (futures if ordered else as_completed(futures)):
+            (index, text, ok, count, skippedCount, failedCount, writesSent, writesSaved,
+             snapshot, watermark) = future.result()
+            click.echo(text, nl=False)
+            if snapshot is not None:
+                metrics.merge(snapshot)
+            failed += not ok
+            failedPRs += failedCount
+            processed += count
+            skipped += skippedCount
+            sent += writesSent
+            saved += writesSaved
+            if ok:
+                counts['/'.join(reposlugs[index])] = count + skippedCount
+            if watermark is not None:
+                watermarks['/'.join(reposlugs[index])] = watermark
+
+    saveState(countsPath, counts)
+    click.echo("Repos: {} OK, {} FAIL, PRs: {}".format(
+        len(reposlugs) - failed, failed, processed), err=True)
+    click.echo("Label writes: {} sent, {} saved{}".format(
+        sent, saved, " (dry run)" if settings['dryRun'] else ""), err=True)
+    if settings['checkpoint'] is not None:
+        click.echo("Skipped {} PRs completed by previous run".format(skipped), err=True)
+    if metrics is not None:
+        click.echo(metrics.summary(), err=True)
+    return failed == 0 and failedPRs == 0, watermarks
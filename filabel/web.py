@@ -1,46 +1,107 @@
 import os
-import configparser
 import sys
 import flask
-import hmac
-import hashlib
+import signal
+import threading
 
 from .github import GitHub
+from .jobs import JobQueue, QueueFull
+from .cache import LabelCache
+from .metrics import Metrics
+from .records import PullRequest
+from .webhook import (ConfigSnapshot, configMtimes, readConfigsFromEnv, checkSignature,
+                      isRelabelAction)
 
 app = flask.Flask(__name__)
 
-def parseConfigsFromEnv():
+def parseConfigsFromEnv(previous=None):
+    """Load config from ENV variable
+
+    :param previous: Current snapshot, its client is kept if token did not change
+    :type previous: ConfigSnapshot or none
+    :raises Exception: Configuration not usable
+    :return: loaded configuration
+    :rtype: ConfigSnapshot
     """
-    Load config from ENV variable
+
+    token, secret, labels, mtimes = readConfigsFromEnv()
+    if previous is not None and previous.token == token:
+        github = previous.github
+    else:
+        github = GitHub(token, labelCache=app.labelCache, metrics=app.metrics)
+    return ConfigSnapshot(token, secret, labels, github, mtimes)
+
+
+def reloadConfig(force=False):
+    """Swap config snapshot if configuration files changed, broken
+    configuration is reported once and current snapshot is kept
+
+    :param force: Reload even if files did not change
+    :type force: bool
     """
 
-    token=None
-    secret=None
-    labels={}
-    
-    if 'FILABEL_CONFIG' not in os.environ:
-        raise Exception('Missing env FILABEL_CONFIG') 
+    snapshot = app.snapshot
+    mtimes = configMtimes(list(snapshot.mtimes))
+    if not force and mtimes in (snapshot.mtimes, app.brokenMtimes):
+        return
+    try:
+        app.snapshot = parseConfigsFromEnv(snapshot)
+        print('Configuration reloaded', file=sys.stderr)
+    except Exception as err:
+        app.brokenMtimes = mtimes
+        print(F'Configuration not reloaded - {err}', file=sys.stderr)
 
-    files = os.environ['FILABEL_CONFIG'].split(':')
-    for file in files:
-        try:
-            config = configparser.ConfigParser()
-            config.read(file)
-            if 'github' in config:
-                token = config['github']['token']
-                secret = config['github']['secret']
-            elif 'labels' in config:
-                for key in config['labels'].keys():
-                    labels[key] = config['labels'][key].strip().split('\n')
-        except:
-            raise Exception(F'Configuration {file} not usable!')
-        
-    if token == None:
-        raise Exception("Missing token")
-
-    app.github = GitHub(token)
-    app.labels = labels
-    app.webhookSecret = secret
+
+def watchConfig(interval):
+    """Reload config when files change or SIGHUP is received, runs in thread
+
+    :param interval: Seconds between modification time checks
+    :type interval: float
+    """
+
+    while True:
+        force = app.reloadRequested.wait(interval)
+        app.reloadRequested.clear()
+        reloadConfig(force)
+
+
+def initialize():
+    """
+    Load config and start job queue and config watcher, called once
+    """
+
+    with app.initLock:
+        if app.snapshot is not None:
+            return
+
+        app.labelCache = None
+        if 'FILABEL_CACHE_DIR' in os.environ:
+            app.labelCache = LabelCache(os.path.join(os.environ['FILABEL_CACHE_DIR'], 'labels'),
+                                        int(os.environ.get('FILABEL_CACHE_SIZE', 256)) * 1024 * 1024,
+                                        int(os.environ.get('FILABEL_CACHE_MAX_AGE', 30)) * 24 * 3600)
+
+        app.metrics = Metrics()
+        snapshot = parseConfigsFromEnv()
+        app.jobs = JobQueue(label,
+                            int(os.environ.get('FILABEL_WORKERS', 4)),
+                            int(os.environ.get('FILABEL_QUEUE_SIZE', 1000)))
+        app.jobs.start()
+
+        app.brokenMtimes = None
+        threading.Thread(target=watchConfig, daemon=True,
+                         args=(float(os.environ.get('FILABEL_RELOAD_INTERVAL', 2)),)).start()
+        app.snapshot = snapshot
+
+
+app.snapshot = None
+app.initLock = threading.Lock()
+app.reloadRequested = threading.Event()
+# Handler can be installed only by main thread, which imports app, not by
+# threads serving requests, SIGHUP before first request reloads once watcher starts
+try:
+    signal.signal(signal.SIGHUP, lambda signum, frame: app.reloadRequested.set())
+except (ValueError, AttributeError):
+    pass
 
 class HTTPException(Exception):
     """
@@ -52,13 +113,14 @@ class HTTPException(Exception):
         self.code = code
         self.message = message
 
-@app.before_first_request
+@app.before_request
 def webhool_load():
     """
-    Parse config on before first request
+    Parse config on first request
     """
 
-    parseConfigsFromEnv()
+    if app.snapshot is None:
+        initialize()
 
 
 @app.route('/',methods=['GET'])
@@ -67,32 +129,25 @@ def index():
     Show Help on intro page
     """
 
-    return flask.render_template('index.html', name=app.github.username,labels = app.labels)
+    snapshot = app.snapshot
+    return flask.render_template('index.html', name=snapshot.github.username,labels = snapshot.labels)
 
-def checkSignature(signature,data):
-    """Check signature data signature
-    
-    :return: success
-    :rtype: bool
+@app.route('/metrics',methods=['GET'])
+def metrics():
+    """
+    Runtime metrics in Prometheus text format
     """
 
-    github_secret = bytes(app.webhookSecret, 'UTF-8')
-    mac = hmac.new(github_secret, msg=data, digestmod=hashlib.sha1)
-    return hmac.compare_digest('sha1=' + mac.hexdigest(), signature)
-
+    app.metrics.gauge('filabel_queue_depth', app.jobs.depth)
+    return flask.Response(app.metrics.render(), mimetype='text/plain; version=0.0.4')
 
-def label(reposlug):
+def label(pr):
     """
-    Parse reposlug to user,repo pair
+    Label PR from event payload, called by job queue worker
     """
 
-    tmp = reposlug.split('/')
-    if len(tmp) != 2:
-        raise HTTPException(F"Reposlug {reposlug} not valid!")
-    try:
-        app.github.processRepo(tmp[0], tmp[1], None, None, app.labels, False)
-    except Exception as err:
-        raise HTTPException(str(err))
+    snapshot = app.snapshot
+    snapshot.github.processPR(pr, snapshot.matcher, False)
 
 @app.route('/',methods=['POST'])
 @app.route('/webhook',methods=['POST'])
@@ -115,7 +170,7 @@ def webhook():
     if signature is None:
         raise HTTPException(F"X-Hub-Signature is missing")
  
-    if not checkSignature(signature,flask.request.data):
+    if not checkSignature(signature,flask.request.data,app.snapshot.secret):
         raise HTTPException(F"Signature is wrong")
 
     content = flask.request.get_json()
@@ -125,10 +180,18 @@ def webhook():
         print(F'Received Ping - {zen}')
         return F'Pong - {zen}'
     elif event == 'pull_request':
-        reposlug = content['pull_request']['head']['repo']['full_name']
-        print(F'Pull request Event - {reposlug}')
-        label(reposlug)
-        return F"Labeled - {reposlug}"
+        reposlug = content['repository']['full_name']
+        number = content['pull_request']['number']
+        action = content.get('action')
+        print(F'Pull request Event - {reposlug}#{number} {action}')
+        if not isRelabelAction(content):
+            return F"Ignored - {reposlug}#{number} {action}"
+        try:
+            status = app.jobs.submit((reposlug, number), PullRequest.fromJson(content['pull_request']),
+                                     headers.get('X-GitHub-Delivery'))
+        except QueueFull as err:
+            raise HTTPException(str(err), 503)
+        return F"Accepted ({status}) - {reposlug}#{number}", 202
     else:
         raise HTTPException("Unknown event")
 
@@ -0,0 +1,124 @@
+import os
+import configparser
+import hmac
+import hashlib
+
+from .matcher import LabelMatcher
+
+
+class ConfigSnapshot:
+    """
+    Immutable loaded configuration
+
+    Snapshot is never modified, reload creates new one and swaps it on app
+    by single assignment, so requests read it without locking.
+    """
+
+    def __init__(self, token, secret, labels, github, mtimes):
+        """Snapshot constructor
+
+        :param token: GitHub API token
+        :type token: string
+        :param secret: Webhook secret
+        :type secret: string
+        :param labels: Labels definition
+        :type labels: dict
+        :param github: Client authenticated by token
+        :type github: GitHub or GitHubAsync
+        :param mtimes: Modification times of configuration files
+        :type mtimes: dict
+        """
+
+        self.token = token
+        self.secret = secret
+        self.labels = labels
+        self.matcher = LabelMatcher(labels)
+        self.github = github
+        self.mtimes = mtimes
+
+
+def configMtimes(files):
+    """Get modification times of configuration files
+
+    :param files: Files paths
+    :type files: list
+    :return: modification time by path, none if file is missing
+    :rtype: dict
+    """
+
+    mtimes = {}
+    for file in files:
+        try:
+            mtimes[file] = os.stat(file).st_mtime_ns
+        except OSError:
+            mtimes[file] = None
+    return mtimes
+
+
+def readConfigsFromEnv():
+    """Read configuration files listed in FILABEL_CONFIG
+
+    :raises Exception: Configuration not usable
+    :return: token, secret, labels definition and modification times of files
+    :rtype: tuple
+    """
+
+    token=None
+    secret=None
+    labels={}
+
+    if 'FILABEL_CONFIG' not in os.environ:
+        raise Exception('Missing env FILABEL_CONFIG')
+
+    files = os.environ['FILABEL_CONFIG'].split(':')
+    mtimes = configMtimes(files)
+    for file in files:
+        try:
+            config = configparser.ConfigParser()
+            config.read(file)
+            if 'github' in config:
+                token = config['github']['token']
+                secret = config['github']['secret']
+            elif 'labels' in config:
+                for key in config['labels'].keys():
+                    labels[key] = config['labels'][key].strip().split('\n')
+        except:
+            raise Exception(F'Configuration {file} not usable!')
+
+    if token == None:
+        raise Exception("Missing token")
+    return token, secret, labels, mtimes
+
+
+def checkSignature(signature,data,secret):
+    """Check signature data signature
+
+    :return: success
+    :rtype: bool
+    """
+
+    github_secret = bytes(secret, 'UTF-8')
+    mac = hmac.new(github_secret, msg=data, digestmod=hashlib.sha1)
+    return hmac.compare_digest('sha1=' + mac.hexdigest(), signature)
+
+
+RELABEL_ACTIONS = {'opened', 'reopened', 'synchronize', 'edited'}
+"""
+Pull request actions which can change PR files
+"""
+
+def isRelabelAction(content):
+    """Check if pull request event can change PR files
+
+    :param content: Event payload
+    :type content: dict
+    :return: PR should be labeled
+    :rtype: bool
+    """
+
+    action = content.get('action')
+    if action not in RELABEL_ACTIONS:
+        return False
+    if action == 'edited':
+        return 'base' in content.get('changes', {})
+    return True
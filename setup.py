@@ -24,6 +24,7 @@ setup(
     entry_points={
         'console_scripts': [
             'filabel = filabel:main',
+            'filabel-web-async = filabel.aioweb:main',
         ]
     },
     install_requires=[
@@ -31,9 +32,13 @@ setup(
         'requests',
         'configparser',
         'flask',
+        'jinja2',
         'aiohttp',
         'asyncio'
     ],
+    extras_require={
+        'fast': ['orjson'],
+    },
     classifiers=[
         'Development Status :: 3 - Alpha',
         'Environment :: Console',
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+from click.testing import CliRunner
+
+import filabel.github as github
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LABELS = """[labels]
+source = src/*
+docs = docs/*
+module1 = src/module1/*
+stale = nothing/*
+"""
+"""
+Labels configuration used by tests, files of fake PRs never match stale
+"""
+
+
+def freePort():
+    """Find unused TCP port
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def call(url, method='GET'):
+    """Call fake API control endpoint
+    """
+    request = urllib.request.Request(url, method=method, data=b'' if method == 'POST' else None)
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+@pytest.fixture(scope='session')
+def apiServer():
+    """
+    Fake GitHub API from benchmarks running for whole session
+    """
+    port = freePort()
+    url = F'http://127.0.0.1:{port}/'
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'benchmarks', 'fakegithub.py'),
+                               '--prs', '12', '--files', '6', '--latency', '0',
+                               '--repos', '3', '--port', str(port)])
+    try:
+        for _ in range(100):
+            try:
+                call(url + '_stats')
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError('Fake GitHub API did not start')
+        yield url
+    finally:
+        server.terminate()
+        server.wait()
+
+
+@pytest.fixture
+def api(apiServer, monkeypatch):
+    """
+    Fake GitHub API with cleared state, clients are pointed to it
+    """
+    call(apiServer + '_reset', 'POST')
+    monkeypatch.setattr(github.GitHub, 'BASE_URL', apiServer)
+    monkeypatch.setattr(github.GitHubAsync, 'BASE_URL', apiServer)
+    return apiServer
+
+
+@pytest.fixture
+def stats(api):
+    """
+    Request counts of fake API
+    """
+    return lambda: call(api + '_stats')
+
+
+@pytest.fixture
+def configs(tmp_path):
+    """
+    Auth and labels configuration arguments
+    """
+    auth = tmp_path / 'auth.cfg'
+    auth.write_text('[github]\ntoken = test\nsecret = test\n')
+    labels = tmp_path / 'labels.cfg'
+    labels.write_text(LABELS)
+    return ['-a', str(auth), '-l', str(labels)]
+
+
+@pytest.fixture
+def filabel(api, configs):
+    """
+    Run CLI against fake API, return click result
+    """
+    from filabel.cli import main
+
+    def run(*args):
+        # CLI closes event loop of main thread when async run ends
+        asyncio.set_event_loop(asyncio.new_event_loop())
+        return CliRunner().invoke(main, configs + list(args))
+    return run
@@ -0,0 +1,42 @@
+import pytest
+
+
+@pytest.mark.parametrize('mode', [[], ['--threads', '4'], ['--async'], ['--graphql'],
+                                  ['--jobs', '2']])
+def testFailedRepoExitStatus(filabel, mode):
+    result = filabel(*mode, 'test/repo0', 'test/missing')
+    assert 'REPO test/missing - FAIL' in result.output
+    assert result.exit_code == 1
+
+
+@pytest.mark.parametrize('mode', [[], ['--async'], ['--jobs', '2']])
+def testFailedPRExitStatus(filabel, mode):
+    result = filabel(*mode, 'test/locked')
+    assert 'REPO test/locked - OK' in result.output
+    assert ' - FAIL' in result.output
+    assert result.exit_code == 1
+
+
+@pytest.mark.parametrize('mode', [[], ['--async'], ['--jobs', '2']])
+def testSuccessExitStatus(filabel, mode):
+    result = filabel(*mode, 'test/repo0', 'test/repo1')
+    assert ' - FAIL' not in result.output
+    assert result.exit_code == 0
+
+
+@pytest.mark.parametrize('mode', [[], ['--async'], ['--jobs', '2']])
+def testRejectedReposLineExitStatus(filabel, tmp_path, mode):
+    reposFile = tmp_path / 'repos.txt'
+    reposFile.write_text('# repos\ntest/repo0\nnot-a-reposlug\n\ntest/repo1\n')
+    result = filabel(*mode, '--repos-file', str(reposFile))
+    assert 'Reposlug not-a-reposlug not valid!' in result.output
+    assert 'REPO test/repo0 - OK' in result.output
+    assert 'REPO test/repo1 - OK' in result.output
+    assert result.exit_code == 1
+
+
+def testValidReposFileExitStatus(filabel, tmp_path):
+    reposFile = tmp_path / 'repos.txt'
+    reposFile.write_text('# repos\ntest/repo0\n\n')
+    result = filabel('--repos-file', str(reposFile))
+    assert result.exit_code == 0
@@ -0,0 +1,113 @@
+import asyncio
+import io
+
+import pytest
+
+from filabel.github import GitHub, GitHubAsync
+from filabel.matcher import LabelMatcher
+from filabel.output import Output
+from filabel.records import PullRequest
+
+
+DELETE = 'DELETE /repos/{user}/{repo}/issues/{number}/labels/{name}'
+
+
+def stalePR(api):
+    """PR carrying label which fake API does not know
+    """
+    return PullRequest(1, api + 'repos/test/repo0/pulls/1', api + 'repos/test/repo0/issues/1',
+                       'https://github.com/test/repo0/pull/1', ['stale'], 'test/repo0')
+
+
+def testRemoveMissingLabelSync(api, stats):
+    output = io.StringIO()
+    client = GitHub('test', output=Output(output))
+    try:
+        assert client.processPR(stalePR(api), LabelMatcher({'stale': ['nothing/*']}), True)
+    finally:
+        client.close()
+    assert stats()[DELETE] == 1
+    assert 'FAIL' not in output.getvalue()
+    assert '- stale' in output.getvalue()
+
+
+def testRemoveMissingLabelAsync(api, stats):
+    output = io.StringIO()
+
+    async def run():
+        client = GitHubAsync('test', output=Output(output))
+        try:
+            return await client.processPR(stalePR(api), LabelMatcher({'stale': ['nothing/*']}), True)
+        finally:
+            await client.close()
+
+    assert asyncio.run(run())
+    assert stats()[DELETE] == 1
+    assert 'FAIL' not in output.getvalue()
+
+
+POST = 'POST /repos/{user}/{repo}/issues/{number}/labels'
+
+
+def failingListing(client, first, second):
+    """Make PR listing of client fail after first PRs were started and
+    second PRs were queued
+    """
+
+    iterPR = client.iterPR
+
+    async def listing(*args):
+        count = 0
+        async for pr in iterPR(*args):
+            yield pr
+            count += 1
+            if count == first:
+                # Started PRs wait for their files
+                await asyncio.sleep(0)
+            if count == first + second:
+                raise Exception('PR get failed')
+
+    client.iterPR = listing
+
+
+def testFailedListingFinishesStartedPRs(api, stats):
+    output = io.StringIO()
+
+    async def run():
+        client = GitHubAsync('test', output=Output(output))
+        failingListing(client, 6, 2)
+        try:
+            ok = await client.processRepo('test', 'repo0', 'open', None,
+                                          LabelMatcher({'source': ['src/*']}), False)
+        finally:
+            await client.close()
+        return ok, client
+
+    ok, client = asyncio.run(run())
+    lines = output.getvalue().splitlines()
+    assert not ok
+    assert lines[-1] == 'REPO test/repo0 - FAIL'
+    assert sum(line.startswith('PR ') for line in lines) == 6
+    assert stats()[POST] == 6
+    assert client.writesSent == 6
+    assert client.processed == 6
+    assert client.failed == 0
+
+
+def testCancelledRepoIsReraised(api):
+    output = io.StringIO()
+
+    async def run():
+        client = GitHubAsync('test', output=Output(output))
+        try:
+            task = asyncio.ensure_future(client.processRepo(
+                'test', 'repo0', 'open', None, LabelMatcher({'source': ['src/*']}), False))
+            while client.processed < 3:
+                await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        finally:
+            await client.close()
+
+    asyncio.run(run())
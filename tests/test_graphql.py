@@ -0,0 +1,80 @@
+import asyncio
+import io
+
+from conftest import call
+from filabel.graphql import GitHubGraphQL
+from filabel.journal import Journal
+from filabel.matcher import LabelMatcher
+from filabel.output import Output
+
+
+def testGraphQLMatchesRest(api, filabel):
+    # GraphQL client extends async one and shares its output format
+    rest = filabel('--async', 'test/repo0', 'test/repo1')
+    assert rest.exit_code == 0
+    assert '+ source' in rest.output
+    call(api + '_reset', 'POST')
+
+    graphql = filabel('--graphql', 'test/repo0', 'test/repo1')
+    assert graphql.exit_code == 0
+    assert graphql.output == rest.output
+
+
+def testGraphQLRelabelKeepsLabels(filabel):
+    assert filabel('--graphql', 'test/repo0').exit_code == 0
+    again = filabel('--graphql', 'test/repo0')
+    assert again.exit_code == 0
+    assert '+ ' not in again.output
+    assert '= source' in again.output
+
+
+def testFailedRepoReleasesPrefetched(api):
+    output = io.StringIO()
+
+    async def run():
+        client = GitHubGraphQL('test', output=Output(output))
+        client.PR_PAGE = 5
+        query = client.query
+        pages = []
+
+        async def failingQuery(text, variables):
+            # Second page fails before queued PRs get to run
+            if pages:
+                raise Exception('GraphQL query failed')
+            pages.append(variables)
+            return await query(text, variables)
+
+        client.query = failingQuery
+        try:
+            ok = await client.processRepo('test', 'repo0', 'open', None,
+                                          LabelMatcher({'source': ['src/*']}), False)
+        finally:
+            await client.close()
+        return ok, client.prefetched
+
+    ok, prefetched = asyncio.run(run())
+    assert not ok
+    assert prefetched == {}
+
+
+def testResumedRunReleasesPrefetched(api, tmp_path):
+    path = str(tmp_path / 'filabel.journal')
+    output = io.StringIO()
+    labels = LabelMatcher({'source': ['src/*']})
+
+    async def run():
+        journal = Journal(path)
+        client = GitHubGraphQL('test', output=Output(output), journal=journal)
+        try:
+            await client.processRepo('test', 'repo0', 'open', None, labels, False)
+        finally:
+            await client.close()
+            journal.close()
+        return client
+
+    first = asyncio.run(run())
+    assert first.processed == 12
+    resumed = asyncio.run(run())
+    assert resumed.processed == 0
+    assert resumed.skipped == 12
+    assert resumed.prefetched == {}
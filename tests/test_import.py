@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FORBIDDEN = ('aiohttp', 'requests', 'flask', 'asyncio')
+"""
+Modules which must not be imported before labeling starts
+"""
+
+BUDGET = 500
+"""
+Generous import time budget of filabel modules in ms, benchmarks/bench_import.py
+reports the exact time
+"""
+
+
+def importTimes(arguments):
+    """Run Python with -X importtime
+
+    :return: cumulative microseconds of imported modules, filabel total
+    :rtype: tuple
+    """
+
+    process = subprocess.run([sys.executable, '-X', 'importtime'] + arguments,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                             env=dict(os.environ, PYTHONPATH=os.pathsep.join(
+                                 [ROOT, os.environ.get('PYTHONPATH', '')])))
+    stderr = process.stderr.decode('utf-8', 'replace')
+    assert process.returncode == 0, stderr[-2000:]
+
+    times = {}
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+        if not name[1:].startswith(' ') and name.strip().startswith('filabel'):
+            total += int(cumulative)
+    return times, total
+
+
+@pytest.mark.parametrize('arguments', [['-c', 'import filabel.cli'],
+                                       ['-m', 'filabel', '--help']])
+def testStartupImports(arguments):
+    best = None
+    for _ in range(3):
+        times, total = importTimes(arguments)
+        assert sorted(name for name in times if name in FORBIDDEN) == []
+        best = total if best is None else min(best, total)
+    assert best / 1000 < BUDGET
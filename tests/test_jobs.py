@@ -0,0 +1,164 @@
+import asyncio
+import threading
+
+import pytest
+
+from filabel.jobs import AsyncJobQueue, JobQueue, QueueFull
+
+
+class Recorder:
+    """
+    Handler recording payloads and the most jobs running at once
+    """
+
+    def __init__(self, block=None):
+        self.calls = []
+        self.active = 0
+        self.maxActive = 0
+        self.started = threading.Event()
+        self.block = block
+        self.lock = threading.Lock()
+
+    def __call__(self, payload):
+        with self.lock:
+            self.active += 1
+            self.maxActive = max(self.maxActive, self.active)
+            self.calls.append(payload)
+        self.started.set()
+        if self.block is not None and len(self.calls) == 1:
+            self.block.wait(5)
+        with self.lock:
+            self.active -= 1
+
+
+def testDuplicateDelivery():
+    queue = JobQueue(Recorder())
+    assert queue.submit('pr1', 1, 'delivery') == 'queued'
+    assert queue.submit('pr2', 2, 'delivery') == 'duplicate'
+    assert queue.depth == 1
+
+
+def testCoalescedRunsOnceWithLatestPayload():
+    handler = Recorder()
+    queue = JobQueue(handler)
+    assert queue.submit('pr', 1, 'a') == 'queued'
+    assert queue.submit('pr', 2, 'b') == 'coalesced'
+    queue.start()
+    queue.join()
+    assert handler.calls == [2]
+
+
+def testResubmittedWhileRunningRunsAgainAfter():
+    release = threading.Event()
+    handler = Recorder(release)
+    queue = JobQueue(handler, workers=4)
+    queue.start()
+    assert queue.submit('pr', 1) == 'queued'
+    assert handler.started.wait(5)
+    assert queue.submit('pr', 2) == 'queued'
+    assert queue.submit('pr', 3) == 'coalesced'
+    release.set()
+    queue.join()
+    assert handler.calls == [1, 3]
+    assert handler.maxActive == 1
+
+
+def testFullQueueAllowsRetry():
+    handler = Recorder()
+    queue = JobQueue(handler, maxDepth=1)
+    assert queue.submit('pr1', 1, 'a') == 'queued'
+    with pytest.raises(QueueFull):
+        queue.submit('pr2', 2, 'b')
+    queue.start()
+    queue.join()
+    assert queue.submit('pr2', 2, 'b') == 'queued'
+    queue.join()
+    assert handler.calls == [1, 2]
+
+
+def runAsync(test):
+    """Run test coroutine with queue of recording coroutine handler
+    """
+
+    calls = []
+    running = set()
+    overlaps = []
+    release = None
+
+    async def handler(payload):
+        key = payload[0]
+        if key in running:
+            overlaps.append(key)
+        running.add(key)
+        calls.append(payload)
+        if len(calls) == 1:
+            await release.wait()
+        else:
+            await asyncio.sleep(0)
+        running.discard(key)
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        queue = AsyncJobQueue(handler, workers=4)
+        try:
+            await test(queue, release, calls)
+        finally:
+            await queue.stop()
+
+    asyncio.run(main())
+    assert overlaps == []
+    return calls
+
+
+async def settle(queue):
+    """Wait until async queue is drained
+    """
+    for _ in range(1000):
+        if not (queue.order or queue.running or queue.pending):
+            return
+        await asyncio.sleep(0.001)
+    raise AssertionError('Queue did not drain')
+
+
+def testAsyncCoalescedAndDuplicate():
+    async def test(queue, release, calls):
+        release.set()
+        assert queue.submit('pr', ('pr', 1), 'a') == 'queued'
+        assert queue.submit('pr', ('pr', 2), 'b') == 'coalesced'
+        assert queue.submit('pr', ('pr', 3), 'a') == 'duplicate'
+        queue.start()
+        await settle(queue)
+
+    assert runAsync(test) == [('pr', 2)]
+
+
+def testAsyncResubmittedWhileRunningRunsAgainAfter():
+    async def test(queue, release, calls):
+        queue.start()
+        assert queue.submit('pr', ('pr', 1)) == 'queued'
+        while not calls:
+            await asyncio.sleep(0.001)
+        assert queue.submit('pr', ('pr', 2)) == 'queued'
+        assert queue.submit('pr', ('pr', 3)) == 'coalesced'
+        await asyncio.sleep(0.01)
+        assert calls == [('pr', 1)]
+        release.set()
+        await settle(queue)
+
+    assert runAsync(test) == [('pr', 1), ('pr', 3)]
+
+
+def testAsyncFullQueueAllowsRetry():
+    async def test(queue, release, calls):
+        release.set()
+        queue.maxDepth = 1
+        assert queue.submit('pr1', ('pr1', 1), 'a') == 'queued'
+        with pytest.raises(QueueFull):
+            queue.submit('pr2', ('pr2', 2), 'b')
+        queue.start()
+        await settle(queue)
+        assert queue.submit('pr2', ('pr2', 2), 'b') == 'queued'
+        await settle(queue)
+
+    assert runAsync(test) == [('pr1', 1), ('pr2', 2)]
@@ -0,0 +1,40 @@
+import pytest
+
+from filabel.github import getLabels
+from filabel.matcher import LabelMatcher
+
+
+LABELS = {
+    'any': ['*'],
+    'source': ['src/*', '*.py'],
+    'single': ['docs/?.rst'],
+    'range': ['img/[a-c]*.png'],
+    'negated': ['data/[!0-9]*'],
+    'literal': ['README', 'setup.cfg'],
+    'blank': [''],
+    'none': [],
+    'nested': ['*/tests/*'],
+}
+
+PATHS = [
+    '', 'README', 'readme', 'README.rst', 'setup.cfg', 'setup.py',
+    'src/main.c', 'src/sub/deep.py', 'lib.py', 'docs/a.rst', 'docs/ab.rst',
+    'img/b1.png', 'img/d1.png', 'img/c.jpg', 'data/x.csv', 'data/1.csv',
+    'pkg/tests/test_x.py', 'tests/test_x.py', 'a [b].txt', '.hidden',
+]
+
+
+@pytest.mark.parametrize('path', PATHS)
+def testMatchPathEqualsGetLabels(path):
+    matcher = LabelMatcher(LABELS)
+    assert matcher.matchPath(path) == set(getLabels(LABELS, path))
+    # Memoized result is the same
+    assert matcher.matchPath(path) == set(getLabels(LABELS, path))
+
+
+def testMatchFilesEqualsGetLabels():
+    matcher = LabelMatcher(LABELS)
+    expected = set()
+    for path in PATHS:
+        expected.update(getLabels(LABELS, path))
+    assert matcher.matchFiles(PATHS) == expected
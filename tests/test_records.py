@@ -0,0 +1,38 @@
+import os
+import sys
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from bench_memory import measure, pages
+from filabel.records import PullRequest, pullRequests
+
+
+BUDGET = 1024
+"""
+Maximal retained bytes per PR record
+"""
+
+
+def testRecordsMemoryBudget():
+    bodies = pages(2000)
+    dicts = measure('dicts', bodies)
+    records = measure('records', bodies)
+    assert records['prs'] == dicts['prs'] == 2000
+    assert records['perPr'] <= BUDGET
+    assert records['retained'] * 10 < dicts['retained']
+    assert records['peak'] < dicts['peak']
+
+
+def testRecordFields():
+    pr, = pullRequests([{
+        'number': 7, 'url': 'api/pulls/7', 'issue_url': 'api/issues/7',
+        'html_url': 'web/pull/7', 'labels': [{'name': 'docs'}], 'updated_at': 'now',
+        'head': {'sha': 'head'}, 'base': {'sha': 'base', 'repo': {'full_name': 'owner/repo'}},
+    }])
+    assert isinstance(pr, PullRequest)
+    assert (pr.number, pr.url, pr.issueUrl, pr.htmlUrl) == (7, 'api/pulls/7', 'api/issues/7', 'web/pull/7')
+    assert (pr.labels, pr.reposlug, pr.headSha, pr.baseSha) == (('docs',), 'owner/repo', 'head', 'base')
+    assert pr.updatedAt == 'now' and pr.changedFiles is None
+    assert not hasattr(pr, '__dict__')
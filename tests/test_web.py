@@ -0,0 +1,29 @@
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGHUP'), reason='SIGHUP is not available')
+def testSighupReloadsWhenServedByThread(api, configs, monkeypatch):
+    monkeypatch.setenv('FILABEL_CONFIG', ':'.join(configs[1::2]))
+    monkeypatch.setenv('FILABEL_RELOAD_INTERVAL', '60')
+    from filabel.web import app
+
+    # Threaded server initializes app on first request outside main thread
+    responses = []
+    thread = threading.Thread(target=lambda: responses.append(app.test_client().get('/')))
+    thread.start()
+    thread.join()
+    assert responses[0].status_code == 200
+    assert callable(signal.getsignal(signal.SIGHUP))
+
+    snapshot = app.snapshot
+    os.kill(os.getpid(), signal.SIGHUP)
+    for _ in range(100):
+        if app.snapshot is not snapshot:
+            break
+        time.sleep(0.05)
+    assert app.snapshot is not snapshot